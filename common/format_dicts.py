@@ -9,7 +9,11 @@
 |------------------------------------------------------------------------------|
 """
 
-import pexpect
+import json
+import re
+
+# A /proc/meminfo line, ex: "MemTotal:       16303828 kB".
+MEMINFO_PATTERN = re.compile(r"^\s*(\S+:)\s+(\d+)(\s+kB)?\s*$", re.M)
 
 
 def strip_dict(dict: list, delimiter: str) -> dict:
@@ -24,11 +28,33 @@ def strip_dict(dict: list, delimiter: str) -> dict:
     """
     stripped_dict = {}
     for entry in dict:
-        temp = entry.lstrip().strip().decode().split(delimiter)
-        for item in range(len(temp)):
-            temp[item] = temp[item].lstrip().strip()
-        if len(temp) > 1:
-            stripped_dict[temp[0]] = temp[1]
+        # Only the text up to the second delimiter is kept, so partition the entry
+        # rather than splitting (and stripping) every part of it.
+        key, found, value = entry.strip().decode().partition(delimiter)
+        if found:
+            stripped_dict[key.strip()] = value.partition(delimiter)[0].strip()
+
+    return stripped_dict
+
+
+def strip_lscpu_json_dict(dict: str) -> dict:
+    """A helper method to flatten the JSON output of lscpu (lscpu -J) into the same
+       dictionary strip_dict creates from its default output.
+
+    Args:
+        dict (str): JSON output of lscpu
+
+    Returns:
+        stripped_dict (dict): Contains the lscpu fields and their data
+    """
+    stripped_dict = {}
+    # Fields are nested under "children" by newer lscpu versions.
+    entries = json.loads(dict)["lscpu"][::-1]
+    while entries:
+        entry = entries.pop()
+        if entry["data"] is not None:
+            stripped_dict[entry["field"].strip().rstrip(":")] = entry["data"]
+        entries.extend(entry.get("children", [])[::-1])
 
     return stripped_dict
 
@@ -44,34 +70,30 @@ def strip_decoded_dict(dict: str, delimiter: str) -> dict:
         stripped_dict (dict): Contains stripped and split information
     """
     stripped_dict = {}
-    dict = dict.split("\n")
-    for entry in dict:
-        temp = entry.lstrip().strip().split(delimiter)
-        for item in range(len(temp)):
-            temp[item] = temp[item].lstrip().strip().replace('"', "")
-        if len(temp) > 1:
-            stripped_dict[temp[0]] = temp[1]
+    for entry in dict.split("\n"):
+        # Only the text up to the second delimiter is kept, so partition the entry
+        # rather than splitting (and stripping) every part of it.
+        key, found, value = entry.strip().partition(delimiter)
+        if found:
+            value = value.partition(delimiter)[0]
+            stripped_dict[key.strip().replace('"', "")] = value.strip().replace('"', "")
 
     return stripped_dict
 
 
-def strip_network_dict(dict: str, delimiter: str, coreos: bool = False) -> dict:
+def strip_network_dict(dict: str, delimiter: str) -> dict:
     """A helper method to strip whitespace and split a dictionary (without decoding)
        of network items.
 
     Args:
         dict (str): Information to be stripped and split into a dictionary
         delimiter (str): Text to split the information on
-        coreos (bool): If the script is running on a coreos system
 
     Returns:
         stripped_dict (dict): Contains stripped and split information
     """
     stripped_dict = {}
-    if coreos:
-        dict = dict.split("\r\n\r\n")
-    else:
-        dict = dict.split("\n\n")
+    dict = dict.split("\n\n")
     for entry in dict:
         temp = entry.lstrip().strip().split(delimiter)
         for item in range(len(temp)):
@@ -80,14 +102,41 @@ def strip_network_dict(dict: str, delimiter: str, coreos: bool = False) -> dict:
             new_list = []
             for line in temp[1].splitlines():
                 new_list.append(line.lstrip().strip().split())
-            if coreos:
-                if "\r\n" in temp[0]:
-                    temp[0] = temp[0].split("\r\n")[1]
             stripped_dict[temp[0]] = new_list
 
-    if not coreos:
-        if "ovirtmgmt" in stripped_dict:
-            del stripped_dict["ovirtmgmt"]
+    if "ovirtmgmt" in stripped_dict:
+        del stripped_dict["ovirtmgmt"]
+    return stripped_dict
+
+
+def strip_ip_network_dict(dict: str) -> dict:
+    """A helper method to create the dictionary strip_network_dict creates from the
+       output of ifconfig, from the JSON output of ip (ip -j addr show). As with
+       ifconfig, only the interfaces that are up are kept, in natural name order.
+
+    Args:
+        dict (str): JSON output of ip addr show
+
+    Returns:
+        stripped_dict (dict): Contains the ether line of each network, if any
+    """
+    stripped_dict = {}
+    interfaces = [
+        interface for interface in json.loads(dict) if "UP" in interface["flags"]
+    ]
+    # Natural order, ex: eth2 before eth10, keeps the logical port numbers that
+    # came from ifconfig's order.
+    interfaces.sort(
+        key=lambda interface: [
+            int(part) if part.isdigit() else part
+            for part in re.split(r"(\d+)", interface["ifname"])
+        ]
+    )
+    for interface in interfaces:
+        stripped_dict[interface["ifname"]] = []
+        if interface.get("link_type") == "ether" and "address" in interface:
+            stripped_dict[interface["ifname"]].append(["ether", interface["address"]])
+
     return stripped_dict
 
 
@@ -120,21 +169,18 @@ def strip_ram_dict(dict: str, delimiter: str) -> dict:
 
 
 def strip_ram_dict_coreos(dict: str) -> dict:
-    """A helper method to strip whitespace and split a dictionary (without decoding)
-       of ram items.
+    """A helper method to split the contents of /proc/meminfo into a dictionary,
+       converting the sizes in kB to MB.
 
     Args:
-        dict (str): Information to be stripped and split into a dictionary
+        dict (str): Contents of /proc/meminfo
 
     Returns:
-        stripped_dict (dict): Contains stripped and split information
+        stripped_dict (dict): Contains the size (or count) of each entry
     """
     stripped_dict = {}
-    dict = dict.split("\n")
-    for entry in dict:
-        temp = entry.lstrip().strip().split()
-        key = temp[0]
-        stripped_dict[key] = temp[1]
+    for key, value, kilobytes in MEMINFO_PATTERN.findall(dict):
+        stripped_dict[key] = int(value) // 1024 if kilobytes else int(value)
 
     return stripped_dict
 
@@ -177,24 +223,21 @@ def strip_disks_dict(dict: str, delimiter: str) -> dict:
     return stripped_dict
 
 
-def strip_disks_dict_coreos(dict: str, delimiter: str) -> dict:
-    """A helper method to strip whitespace and split a dictionary (without decoding)
-       of disk items.
+def strip_lsblk_disks_dict(dict: str) -> dict:
+    """A helper method to create a dictionary of the disks in the JSON output of
+       lsblk (lsblk -J -b -o NAME,SIZE,TYPE).
 
     Args:
-        dict (str): Information to be stripped and split into a dictionary
-        delimiter (str): Text to split the information on
+        dict (str): JSON output of lsblk, with sizes in bytes
 
     Returns:
-        stripped_dict (dict): Contains stripped and split information
+        stripped_dict (dict): Contains the size of each disk, in MB
     """
     stripped_dict = {}
-    dict = dict.split("\n")
-    for entry in dict:
-        temp = entry.lstrip().strip().split()
-        if temp[-1] == "disk":
-            stripped_dict[temp[0]] = {}
-            stripped_dict[temp[0]]["Size"] = temp[3]
+    for device in json.loads(dict)["blockdevices"]:
+        if device["type"] == "disk":
+            # Older lsblk versions give the size as a string.
+            stripped_dict[device["name"]] = {"Size": int(device["size"]) // 1000000}
 
     return stripped_dict
 
@@ -229,40 +272,26 @@ def strip_nics_dict(dict: str, nic_delimiter: str, line_delimiter: str) -> dict:
     return stripped_dict
 
 
-def strip_nics_dict_coreos(
-    dict: str, nic_delimiter: str, line_delimiter: str, child: pexpect.pty_spawn.spawn
-) -> dict:
-    """A helper method to strip whitespace and split a dictionary (without decoding)
-       of NIC items.
+def strip_ip_nics_dict(dict: str, nics: list, speeds: dict) -> dict:
+    """A helper method to create a dictionary of the ethernet NICs in the JSON output
+       of ip (ip -j addr show).
 
     Args:
-        dict (str): Information to be stripped and split into a dictionary
-        nic_delimiter (str): Text to split the nics on
-        line_delimiter (str): Text to split the lines on
-        child (pexpect.pty_spawn.spawn): Pexpect spawn object from main script
+        dict (str): JSON output of ip addr show
+        nics (list): The names of the interfaces which are NICs
+        speeds (dict): The contents of /sys/class/net/<nic>/speed, keyed by NIC
 
     Returns:
-        stripped_dict (dict): Contains stripped and split information
+        stripped_dict (dict): Contains the MAC address and speed of each NIC
     """
     stripped_dict = {}
-    dict = dict.split(nic_delimiter)
-    curr_nic = ""
-    for entry in dict:
-        if line_delimiter in entry:
-            split_entry = entry.split(": ")
-            stripped_dict[split_entry[1]] = {}
-            curr_nic = split_entry[1]
-        else:
-            split_entry = entry.split()
-            if split_entry[0] == "link/ether":
-                stripped_dict[curr_nic]["serial"] = split_entry[1]
-                try:
-                    child.sendline("sudo cat /sys/class/net/" + curr_nic + "/speed")
-                    child.expect(".*\$ ", timeout=30)  # noqa: W605
-                    capacity = child.after.strip().decode().split("\n")[1].strip()
-                    stripped_dict[curr_nic]["capacity"] = capacity
-                except Exception:
-                    stripped_dict[curr_nic]["capacity"] = ""
+    for interface in json.loads(dict):
+        name = interface["ifname"]
+        if name in nics and interface.get("link_type") == "ether":
+            stripped_dict[name] = {
+                "serial": interface["address"],
+                "capacity": speeds.get(name, "").strip(),
+            }
 
     return stripped_dict
 
@@ -297,6 +326,32 @@ def strip_gpu_dict(dict: str, gpu_delimiter: str, line_delimiter: str) -> dict:
     return stripped_dict
 
 
+def split_lshw_classes(dict: str, delimiter: str, id_prefix: str) -> tuple:
+    """A helper method to split the output of a single lshw run listing several
+       classes of hardware, ex: lshw -class network -class display, in two.
+
+    Args:
+        dict (str): Information to be split
+        delimiter (str): Text that starts each lshw entry
+        id_prefix (str): Start of the lshw ids of the entries to split out, ex:
+                         "display" for the "*-display" entries
+
+    Returns:
+        (tuple[str, str]): The entries matching id_prefix and the other entries, as
+                           lshw would print them if run for each class separately
+    """
+    matching_entries = [""]
+    other_entries = [""]
+    entries = dict.split(delimiter)
+    for entry in entries[1:]:
+        if entry.startswith("-" + id_prefix):
+            matching_entries.append(entry)
+        else:
+            other_entries.append(entry)
+
+    return delimiter.join(matching_entries), delimiter.join(other_entries)
+
+
 def strip_brctl_showmacs_switch_dict(dict: str, delimiter: str) -> dict:
     """A helper method to strip whitespace and split a dictionary (without decoding)
        of switch items when the 'brctl showmacs br0' command is run.
@@ -362,37 +417,3 @@ def strip_show_mac_address_table_switch_dict(dict: str, delimiter: str) -> dict:
                 temp[3] + " " + "{:02d}".format(interface_mac_count[temp[3]])
             )
     return stripped_dict
-
-
-def strip_accelerator_dict(dict: str, delimiter: str) -> dict:
-    """A helper method to strip whitespace and split a Processing accelerators
-       dictionary (without decoding).
-
-    Args:
-        dict (str): Information to be stripped and split into a dictionary
-        delimiter (str): Text to split the information on
-
-    Returns:
-        stripped_dict (dict): Contains stripped and split information
-    """
-    stripped_dict = {}
-    print(dict)
-    dict = dict.split("\n")
-    for entry in dict:
-        temp_dict = {}
-        temp = entry.lstrip().strip().split(delimiter)
-        if "Device" in temp and "accelerators:" in temp:
-            device_index = temp.index("Device")
-            manufacturer_index = temp.index("accelerators:") + 1
-            manufacturer = ""
-            manufacturer_length = device_index - manufacturer_index
-
-            for i in range(manufacturer_length):
-                manufacturer += temp[manufacturer_index + i]
-                if i < (manufacturer_length - 1):
-                    manufacturer += " "
-            temp_dict["device"] = temp[device_index + 1]
-            temp_dict["manufacturer"] = manufacturer
-            stripped_dict[temp[0]] = temp_dict
-
-    return stripped_dict
@@ -11,11 +11,19 @@
 
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from common.urlinitialization import UrlInitialization
 
 
 log = logging.getLogger(__name__)
 
+# Size of the connection pool kept open to GLPI, enough for the scripts that
+# send requests concurrently.
+POOL_MAXSIZE = 64
+# Statuses from a proxy or a busy GLPI server that are worth retrying.
+RETRY_STATUSES = [502, 503, 504]
+
 
 class SessionHandler:
     def __init__(
@@ -33,6 +41,20 @@ class SessionHandler:
         log.debug("\nInitializing the REST session:")
         self.del_url = urls.KILL_URL
         self.session = requests.Session()
+        # Keep connections to GLPI alive and reuse them across requests and
+        # threads, retrying requests that fail to connect or hit a transient
+        # error. Once out of retries, the last response is returned as before.
+        adapter = HTTPAdapter(
+            pool_maxsize=POOL_MAXSIZE,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.1,
+                status_forcelist=RETRY_STATUSES,
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         self.session.headers.update({"Authorization": "user_token " + token})
         if no_verify:
             try:
@@ -89,6 +89,7 @@ class UrlInitialization:
         self.LOCATION_URL = self.BASE_URL + "Location/"
         self.BMC_URL = self.BASE_URL + "PluginFieldsComputerbmcaddres/"
         self.GROUP_URL = self.BASE_URL + "Group/"
+        self.GROUP_USER_URL = self.BASE_URL + "Group_User/"
         self.PLUGIN_URL = self.BASE_URL + "Plugin/"
         self.TAG_URL = self.BASE_URL + "PluginTagTag/"
         self.TAG_ITEM_URL = self.BASE_URL + "PluginTagTagItem/"
@@ -12,16 +12,34 @@
 
 from common.urlinitialization import UrlInitialization
 from common.switches import Switches
+import datetime
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import pexpect
+import yaml
 import common.format_dicts as format_dicts
 from prettytable import PrettyTable
 
+# Use the libyaml based loader when PyYAML was built with it, as it is much faster
+# than the pure Python loader.
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Query parameters for GLPI requests that only need the fields of each item, and
+# not the links to related items that GLPI adds by default.
+WITHOUT_LINKS = {"get_hateoas": "false"}
+# Max number of GLPI tables fetched at once by prefetch_fields
+PREFETCH_MAX_WORKERS = 8
+
 
 def check_field(
     session: requests.sessions.Session,
     url: str,
     search_criteria: dict,
+    glpi_fields_cache: dict = None,
 ) -> str:
     """Method for getting the glpi fields at the given url and checking if a
        specific field exists.
@@ -30,11 +48,19 @@ def check_field(
         session (Session object): The requests session object
         url (str):                The url to get the fields
         search_criteria (dict):   A dictionary of criteria to match w/ GLPI fields.
+        glpi_fields_cache (dict): Optional GLPI fields already fetched, keyed by
+                                  url. The fields at the url are only fetched if
+                                  they aren't cached yet.
 
     Returns:
         (str): The field ID if found, None otherwise
     """
-    glpi_fields_list = check_fields(session, url)
+    if glpi_fields_cache is None:
+        glpi_fields_list = check_fields(session, url)
+    else:
+        if url not in glpi_fields_cache:
+            glpi_fields_cache[url] = check_fields(session, url)
+        glpi_fields_list = glpi_fields_cache[url]
     # Check if the field is present at the URL endpoint.
     for glpi_field in glpi_fields_list:
         if all(glpi_field[key] == value for key, value in search_criteria.items()):
@@ -42,12 +68,16 @@ def check_field(
     return None
 
 
-def check_fields(session: requests.sessions.Session, url: str) -> list:
+def check_fields(
+    session: requests.sessions.Session, url: str, params: dict = None
+) -> list:
     """Method for getting the glpi fields at the given url
 
     Args:
         session (Session object): The requests session object
         url (str): The url to get the fields
+        params (dict): Additional query parameters, ex: {"get_hateoas": "false"}
+                       to leave out the links of each field
 
     Returns:
         glpi_fields_list (list): The list of glpi fields at the URL
@@ -60,22 +90,66 @@ def check_fields(session: requests.sessions.Session, url: str) -> list:
         range_url = (
             url + "?range=" + str(api_range) + "-" + str(api_range + api_increment)
         )
-        glpi_fields = session.get(url=range_url)
-        if (
-            glpi_fields.json()
-            and glpi_fields.json()[0] == "ERROR_RESOURCE_NOT_FOUND_NOR_COMMONDBTM"
-        ):
+        if params:
+            range_url += "&" + urllib.parse.urlencode(params)
+        # Decode each page once, Response.json() parses the body on every call.
+        glpi_fields = session.get(url=range_url).json()
+        if glpi_fields and glpi_fields[0] == "ERROR_RESOURCE_NOT_FOUND_NOR_COMMONDBTM":
             more_fields = False
-            glpi_fields_list.extend(glpi_fields.json())
-        elif glpi_fields.json() and glpi_fields.json()[0] == "ERROR_RANGE_EXCEED_TOTAL":
+            glpi_fields_list.extend(glpi_fields)
+        elif glpi_fields and glpi_fields[0] == "ERROR_RANGE_EXCEED_TOTAL":
             more_fields = False
         else:
-            glpi_fields_list.extend(glpi_fields.json())
+            glpi_fields_list.extend(glpi_fields)
             api_range += api_increment
 
     return glpi_fields_list
 
 
+def get_computers_by_serial(
+    session: requests.sessions.Session, computer_url: str, serial: str
+) -> list:
+    """Method for getting the glpi computers with a specific serial number. GLPI
+       filters the computers, rather than every computer being fetched.
+
+    Args:
+        session (Session object): The requests session object
+        computer_url (str): The url of the computers
+        serial (str): The serial number to look for
+
+    Returns:
+        (list): The glpi computers with the serial number
+    """
+    params = {"searchText[serial]": serial}
+    params.update(WITHOUT_LINKS)
+    computers = check_fields(session, computer_url, params)
+    # searchText also matches serial numbers containing the one searched for.
+    return [computer for computer in computers if computer["serial"] == serial]
+
+
+def prefetch_fields(
+    session: requests.sessions.Session, urls: list, glpi_fields_cache: dict
+) -> None:
+    """Method for fetching the glpi fields at several urls concurrently, rather than
+       one after the other on first use, into a fields cache (see check_and_post)
+
+    Args:
+        session (Session object): The requests session object
+        urls (list): The urls to get the fields
+        glpi_fields_cache (dict): GLPI fields already fetched, keyed by url
+    """
+    missing_urls = [url for url in urls if url not in glpi_fields_cache]
+    if not missing_urls:
+        return
+    with ThreadPoolExecutor(
+        max_workers=min(len(missing_urls), PREFETCH_MAX_WORKERS)
+    ) as executor:
+        fields_lists = executor.map(
+            lambda url: check_fields(session, url), missing_urls
+        )
+        glpi_fields_cache.update(zip(missing_urls, fields_lists))
+
+
 def check_field_without_range(session: requests.sessions.Session, url: str) -> list:
     """Method for getting the glpi fields at the given url (without
        ranges/lists)
@@ -96,6 +170,7 @@ def check_and_post(
     url: str,
     search_criteria: dict,
     additional_information: dict = None,
+    glpi_fields_cache: dict = None,
 ) -> int:
     """A helper method to check the field at the given API endpoint (URL) and post
        the field if it is not present.
@@ -117,23 +192,131 @@ def check_and_post(
             and location were all the same, but its color was different, a new rack
             should NOT be created, as that isn't a characteristic that helps identify a
             unique rack. Instead, the existing rack should be updated in place.
+        glpi_fields_cache (dict): Optional GLPI fields already fetched, keyed by url.
+            Passing the same dictionary to several calls fetches the fields at each
+            url only once, rather than on every call. It is kept up to date with
+            the created and updated item, so an item that already has the desired
+            state (ex: one posted by an earlier call) isn't updated again.
 
     Returns:
         id (int): the id of the field.
     """
     print(f"Checking GLPI fields for {url}:")
     # Check if the field is present at the URL endpoint.
-    id = check_field(session, url, search_criteria)
+    id = check_field(session, url, search_criteria, glpi_fields_cache)
 
     # Create a field if one was not found and return the ID.
     if additional_information is not None:
         search_criteria.update(additional_information)
-    if id is not None:
-        search_criteria.update({"id": id})
-    id = create_or_update_glpi_item(session, url, search_criteria, id)
+    if glpi_fields_cache is None:
+        if id is not None:
+            if additional_information is None:
+                # The item matched every field that would be sent, so an update
+                # wouldn't change anything.
+                print(f"Item at {url} is up to date\n")
+                return id
+            search_criteria.update({"id": id})
+        return create_or_update_glpi_item(session, url, search_criteria, id)
+
+    if id is None:
+        id = create_or_update_glpi_item(session, url, search_criteria, id)
+        glpi_fields_cache[url].append(dict(search_criteria, id=id))
+        return id
+
+    glpi_field = next(field for field in glpi_fields_cache[url] if field["id"] == id)
+    if all(
+        key in glpi_field and glpi_field[key] == value
+        for key, value in search_criteria.items()
+    ):
+        print(f"Item at {url} is up to date\n")
+        return id
+    search_criteria.update({"id": id})
+    create_or_update_glpi_item(session, url, search_criteria, id)
+    glpi_field.update(search_criteria)
     return id
 
 
+def check_and_post_items(
+    session: requests.sessions.Session,
+    url: str,
+    items: list,
+    glpi_fields_cache: dict = None,
+    additional_information: list = None,
+) -> None:
+    """A helper method to check several fields at the given API endpoint (URL) and
+       post the ones that are not present, all in a single request.
+
+    Args:
+        session (Session object): The requests session object
+        url (str): The url of the components to be populated
+        items (list): Dictionaries containing the desired state of each GLPI item,
+            used both to check GLPI for pre-existing items and to post the missing
+            ones (see search_criteria of check_and_post())
+        glpi_fields_cache (dict): Optional GLPI fields already fetched, keyed by url,
+            see check_and_post()
+        additional_information (list): Optional dictionaries, one for each item,
+            containing fields that shouldn't be used to check GLPI, but should be
+            sent when the item is posted. Pre-existing items whose fields differ are
+            updated, all in a single request (see check_and_post())
+    """
+    print(f"Checking GLPI fields for {url}:")
+    if glpi_fields_cache is None:
+        glpi_fields_cache = {}
+    if additional_information is None:
+        additional_information = [{}] * len(items)
+    checked_items = []
+    new_items = []
+    updated_items = []
+    for search_criteria, information in zip(items, additional_information):
+        if search_criteria in checked_items:
+            continue
+        checked_items.append(search_criteria)
+        id = check_field(session, url, search_criteria, glpi_fields_cache)
+        if id is None:
+            new_items.append(dict(search_criteria, **information))
+            continue
+        glpi_field = next(
+            field for field in glpi_fields_cache[url] if field["id"] == id
+        )
+        if any(glpi_field.get(key) != value for key, value in information.items()):
+            updated_items.append(dict(information, id=id))
+    if not new_items and not updated_items:
+        print(f"Items at {url} are up to date\n")
+        return
+
+    if updated_items:
+        # GLPI also accepts a list of items to update, each with its ID.
+        put_response = session.put(url=url, json={"input": updated_items})
+        print(str(put_response) + "\n")
+        if put_response.ok:
+            print(f"Updated {len(updated_items)} items at {url}")
+            for updated_item in updated_items:
+                next(
+                    field
+                    for field in glpi_fields_cache[url]
+                    if field["id"] == updated_item["id"]
+                ).update(updated_item)
+        else:
+            print(f"Unable to update {len(updated_items)} items at {url}:")
+            print(str(put_response.text) + "\n")
+    if not new_items:
+        return
+
+    # GLPI accepts a list of items as input, and answers with the ID of each.
+    post_response = session.post(url=url, json={"input": new_items})
+    print(str(post_response) + "\n")
+    if not post_response.ok:
+        # A rejected request is answered with an error list, ex: ["ERROR_...", "msg"]
+        print(f"Unable to create {len(new_items)} items at {url}:")
+        print(str(post_response.text) + "\n")
+        return
+    print(f"Created {len(new_items)} items at {url}")
+    for new_item, created_item in zip(new_items, post_response.json()):
+        # A failed item is answered with {"id": false, "message": "..."}.
+        if isinstance(created_item, dict) and created_item.get("id"):
+            glpi_fields_cache[url].append(dict(new_item, id=created_item["id"]))
+
+
 def check_and_post_processor(
     session: requests.sessions.Session, field: dict, url: str, urls: UrlInitialization
 ) -> int:
@@ -456,11 +639,12 @@ def check_and_post_device_memory_item(
         "size": size,
     }
 
-    for id in ids:
-        post_response = session.put(url=url, json={"input": glpi_post})
-        print(str(post_response) + "\n")
-    for i in range(quantity - len(ids)):
-        post_response = session.post(url=url, json={"input": glpi_post})
+    # The memory items found already match every field of glpi_post, so only the
+    # missing ones are sent, in a single request as GLPI accepts a list as input.
+    if quantity > len(ids):
+        post_response = session.post(
+            url=url, json={"input": [glpi_post] * (quantity - len(ids))}
+        )
         print(str(post_response) + "\n")
 
     return
@@ -512,6 +696,18 @@ def check_and_remove_unspecified_device_memory_item(
     return
 
 
+def load_yaml(stream) -> object:
+    """Safely parse YAML, using the C loader where available
+
+    Args:
+        stream (str or file): The YAML document or an open YAML file
+
+    Returns:
+        object: The parsed YAML document
+    """
+    return yaml.load(stream, Loader=SafeLoader)
+
+
 def print_final_help() -> None:
     """Print the final usage help for the user"""
     print(
@@ -520,6 +716,60 @@ def print_final_help() -> None:
     )
 
 
+def get_reservation_details(
+    session: requests.sessions.Session,
+    urls: UrlInitialization,
+    hostname: str = None,
+    user: str = None,
+) -> list:
+    """Method for getting the GLPI reservations along with their user and
+       reserved item
+
+    Args:
+        session (Session object):        the requests session object
+        urls (UrlInitialization object): the URL object
+        hostname (str):                  Name of computer to search for
+        user (str):                      Name of user to search for
+
+    Returns:
+        list: (reservation, user, reservation item, item) tuples of GLPI fields
+    """
+    reservation_details = []
+
+    for reservation in check_fields(session, urls.RESERVATION_URL):
+        reservation_item_json = check_field_without_range(
+            session,
+            (urls.RESERVATION_ITEM_URL + str(reservation["reservationitems_id"])),
+        )
+        user_json = check_field_without_range(
+            session, (urls.USER_URL + str(reservation["users_id"]))
+        )
+
+        # If searching for specific user, only select
+        # reservations with that username.
+        if user and user.lower() not in user_json["name"].lower():
+            continue
+
+        item_json = check_field_without_range(
+            session,
+            urls.BASE_URL
+            + reservation_item_json["itemtype"]
+            + "/"
+            + str(reservation_item_json["items_id"]),
+        )
+
+        # If searching for specific hostname, only select
+        # reservations with that hostname.
+        if hostname and hostname != item_json["name"]:
+            continue
+
+        reservation_details.append(
+            (reservation, user_json, reservation_item_json, item_json)
+        )
+
+    return reservation_details
+
+
 def get_reservations(
     session: requests.sessions.Session,
     urls: UrlInitialization,
@@ -541,35 +791,14 @@ def get_reservations(
 
     reservations_output = ""
 
-    reservation_json = check_fields(session, urls.RESERVATION_URL)
-    if reservation_json:
-        for reservation in reservation_json:
-            reservation_item_json = check_field_without_range(
-                session,
-                (urls.RESERVATION_ITEM_URL + str(reservation["reservationitems_id"])),
-            )
-            user_json = check_field_without_range(
-                session, (urls.USER_URL + str(reservation["users_id"]))
-            )
-
-            # If searching for specific user, only select
-            # reservations with that username.
-            if user and user.lower() not in user_json["name"].lower():
-                continue
-
-            item_json = check_field_without_range(
-                session,
-                urls.BASE_URL
-                + reservation_item_json["itemtype"]
-                + "/"
-                + str(reservation_item_json["items_id"]),
-            )
-
-            # If searching for specific hostname, only select
-            # reservations with that hostname.
-            if hostname and hostname != item_json["name"]:
-                continue
-
+    reservation_details = get_reservation_details(session, urls, hostname, user)
+    if reservation_details:
+        for (
+            reservation,
+            user_json,
+            reservation_item_json,
+            item_json,
+        ) in reservation_details:
             reservations_output += "Reservation " + str(reservation["id"]) + ":" + "\n"
             reservations_output += (
                 "  User "
@@ -599,6 +828,39 @@ def get_reservations(
     return reservations_output
 
 
+def get_reservations_dict(
+    session: requests.sessions.Session, urls: UrlInitialization
+) -> dict:
+    """Method for getting all reservations as a dictionary, in the same layout
+       as the output of get_reservations, without formatting and parsing it
+
+    Args:
+        session (Session object):        the requests session object
+        urls (UrlInitialization object): the URL object
+
+    Returns:
+        reservations (dict): the reservations from GLPI, keyed by "Reservation <id>"
+    """
+    reservations = {}
+    for (
+        reservation,
+        user_json,
+        reservation_item_json,
+        item_json,
+    ) in get_reservation_details(session, urls):
+        reservations["Reservation " + str(reservation["id"])] = {
+            "User " + str(reservation["users_id"]): user_json["name"],
+            reservation_item_json["itemtype"]
+            + " "
+            + str(reservation_item_json["items_id"]): item_json["name"],
+            "Begins": datetime.datetime.fromisoformat(reservation["begin"]),
+            "Ends": datetime.datetime.fromisoformat(reservation["end"]),
+            "Comment": reservation["comment"] or "N/A",
+        }
+
+    return reservations
+
+
 def get_switch_ports(lab: str, switch: str, switch_info: Switches) -> dict:
     """A helper method to get switch ports via ssh from the switch IP address
        input. After logging into the switch use the global switch command and call
@@ -716,8 +978,20 @@ def check_computer_reservable(session: str, link: str) -> bool:
     computer_reservable = check_field_without_range(
         session, link["href"].replace("/glpi", "")
     )
-    if computer_reservable:
-        for reservation_info in computer_reservable:
+    return reservation_item_active(computer_reservable)
+
+
+def reservation_item_active(reservation_items: list) -> bool:
+    """Check if any of the reservation items of a computer are active
+
+    Args:
+        reservation_items (list): the GLPI reservation items of the machine
+
+    Returns:
+        True: on reservable, False otherwise
+    """
+    if reservation_items:
+        for reservation_info in reservation_items:
             if reservation_info["is_active"]:
                 return True
 
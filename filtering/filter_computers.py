@@ -21,12 +21,13 @@ from common.utils import (
     check_fields,
     check_field_without_range,
     print_final_help,
-    check_computer_reservable,
-    get_reservations,
+    reservation_item_active,
+    get_reservations_dict,
+    load_yaml,
 )
 from common.parser import argparser
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple
-import yaml
 import operator
 import requests
 
@@ -36,6 +37,19 @@ import urllib3
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Number of concurrent GLPI requests used when prefetching computer links.
+MAX_WORKERS = 32
+# Number of computers checked between progress updates.
+PROGRESS_INTERVAL = 64
+# Computer links that are inspected when checking requirements.
+PREFETCH_RELS = (
+    "ReservationItem",
+    "Item_DeviceProcessor",
+    "Item_DeviceMemory",
+    "Item_DeviceGraphicCard",
+    "Item_DeviceNetworkCard",
+)
+
 
 def main() -> None:
     """Main function"""
@@ -72,13 +86,20 @@ def main() -> None:
     requirements = parse_list(list)
 
     with SessionHandler(user_token, urls, no_verify) as session:
-        reservations = yaml.safe_load(get_reservations(session, urls))
+        reservations = get_reservations_dict(session, urls)
         computers = check_fields(session, urls.COMPUTER_URL)
         disks = check_fields(session, urls.DISK_ITEM_URL)
         disks.sort(key=operator.itemgetter("totalsize"))
+        disks_by_computer = index_disks(disks)
+        link_cache = prefetch_links(session, computers)
 
         available, final_choices = reservable(
-            session, reservations, computers, disks, requirements
+            session,
+            reservations,
+            computers,
+            disks_by_computer,
+            requirements,
+            link_cache,
         )
 
     print_final_decision(available, final_choices, requirements, urls)
@@ -103,7 +124,7 @@ def parse_list(list: str) -> list:
     requirements = ""
     try:
         f = open(list, "r")
-        requirements = yaml.safe_load(f)
+        requirements = load_yaml(f)
         f.close()
     except Exception as e:
         sys.exit("Can't open or parse " + list + ": " + e)
@@ -112,12 +133,150 @@ def parse_list(list: str) -> list:
     return requirements
 
 
+def prefetch_links(session: requests.sessions.Session, computers: list) -> dict:
+    """Concurrently get the GLPI links of every computer that are needed to check
+       requirements, so that filtering doesn't wait on one request at a time
+
+    Args:
+        session (requests.sessions.Session): The requests session object
+        computers (list):                    the list of GLPI computers
+
+    Returns:
+        link_cache (dict): the GLPI response for each link, keyed by href
+    """
+    hrefs = list(
+        {
+            link["href"]
+            for computer in computers
+            for link in computer["links"]
+            if link["rel"] in PREFETCH_RELS
+        }
+    )
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        responses = executor.map(
+            lambda href: check_field_without_range(
+                session, href.replace("/glpi", "")
+            ),
+            hrefs,
+        )
+        link_cache = dict(zip(hrefs, responses))
+
+    return link_cache
+
+
+# NOTE: Need to replace this added glpi in the path.
+#       Why is that there in the href?
+def get_link(session: requests.sessions.Session, link: dict, link_cache: dict) -> list:
+    """Get the GLPI response for a link, only querying GLPI the first time a given
+       href is seen
+
+    Args:
+        session (requests.sessions.Session): The requests session object
+        link (dict):                         the GLPI link to get
+        link_cache (dict):                   the GLPI responses fetched so far
+
+    Returns:
+        list: the GLPI response for the link
+    """
+    # The cache is keyed by the href as GLPI returns it, so the path only needs
+    # fixing up when the link is actually fetched.
+    href = link["href"]
+    if href not in link_cache:
+        link_cache[href] = check_field_without_range(
+            session, href.replace("/glpi", "")
+        )
+    return link_cache[href]
+
+
+def index_reservations(reservations: dict) -> dict:
+    """Group the time frames of the GLPI reservations by the reserved computer
+
+    Args:
+        reservations (dict): the GLPI reservations, from get_reservations_dict
+
+    Returns:
+        reservations_by_computer (dict): (begin, end) tuples keyed by computer ID
+    """
+    reservations_by_computer = {}
+    for reservation in reservations.values():
+        for key in reservation:
+            item_type, _, item_id = key.partition(" ")
+            if item_type == "Computer":
+                reservations_by_computer.setdefault(int(item_id), []).append(
+                    (reservation["Begins"], reservation["Ends"])
+                )
+
+    return reservations_by_computer
+
+
+def get_reservable_computers(
+    session: requests.sessions.Session, computers: list, link_cache: dict
+) -> set:
+    """Get the computers that are reservable, which doesn't depend on the
+       requirements, so it is only checked once per computer
+
+    Args:
+        session (requests.sessions.Session): The requests session object
+        computers (list):                    the list of GLPI computers
+        link_cache (dict): the GLPI responses fetched so far, keyed by href
+
+    Returns:
+        reservable_computers (set): the IDs of the reservable computers
+    """
+    reservable_computers = set()
+    for computer in computers:
+        computer_reservable = False
+        for link in computer["links"]:
+            if link["rel"] == "ReservationItem":
+                computer_reservable = reservation_item_active(
+                    get_link(session, link, link_cache)
+                )
+        if computer_reservable:
+            reservable_computers.add(computer["id"])
+
+    return reservable_computers
+
+
+def get_computer_resources(
+    session: requests.sessions.Session, computers: list, link_cache: dict
+) -> dict:
+    """Total up the processors, cores and memory of each computer, which don't
+       depend on the requirements, so they are only counted once per computer
+
+    Args:
+        session (requests.sessions.Session): The requests session object
+        computers (list):                    the list of GLPI computers
+        link_cache (dict): the GLPI responses fetched so far, keyed by href
+
+    Returns:
+        computer_resources (dict): the "cpus", "cores" and "ram" totals of each
+                                   computer, keyed by computer ID. Totals are
+                                   missing if the computer has no such link.
+    """
+    computer_resources = {}
+    for computer in computers:
+        resources = {}
+        for link in computer["links"]:
+            if link["rel"] == "Item_DeviceProcessor":
+                cpus = get_link(session, link, link_cache)
+                resources["cpus"] = len(cpus)
+                resources["cores"] = sum(int(cpu["nbcores"]) for cpu in cpus)
+            elif link["rel"] == "Item_DeviceMemory":
+                resources["ram"] = sum(
+                    int(dimm["size"]) for dimm in get_link(session, link, link_cache)
+                )
+        computer_resources[computer["id"]] = resources
+
+    return computer_resources
+
+
 def reservable(  # noqa: C901
     session: requests.sessions.Session,
     reservations: list,
     computers: list,
-    disks: list,
+    disks_by_computer: dict,
     requirements: list,
+    link_cache: dict,
 ) -> Tuple[dict, dict]:
     """Check for reservable computers, using weighting where able to get as
        close to the requirements as possible
@@ -126,8 +285,9 @@ def reservable(  # noqa: C901
         session (requests.sessions.Session):    The requests session object
         reservations (list): the list of GLPI reservations
         computers (list):    the list of GLPI computers
-        disks (list):        the list of GLPI disks
+        disks_by_computer (dict): the GLPI disks, keyed by computer ID
         requirements (list): the list of requirements for reservations
+        link_cache (dict):   the GLPI responses fetched so far, keyed by href
 
     Returns:
         available (dict):      the dictionary of all choices
@@ -139,100 +299,97 @@ def reservable(  # noqa: C901
         + "----------------------------------------------------------------"
     )
     available = {}
+    reservations_by_computer = index_reservations(reservations)
+    reservable_computers = get_reservable_computers(session, computers, link_cache)
+    # Only reservable computers can be picked, which doesn't depend on the
+    # requirements, so the rest are dropped once up front.
+    computers = [
+        computer for computer in computers if computer["id"] in reservable_computers
+    ]
+    computer_resources = get_computer_resources(session, computers, link_cache)
 
     total_rounds = len(requirements) * len(computers)
     curr_round = 0
     for requirement in requirements:
+        # Sort a copy of the disk requirements once per requirement, leaving the
+        # parsed requirements untouched.
+        disks_req = sorted(
+            requirements[requirement].get("disks", []),
+            key=operator.itemgetter("storage"),
+        )
+        start = requirements[requirement]["start"]
+        end = requirements[requirement]["end"]
         for computer in computers:
             cpu_weight = None
             core_weight = None
             memory_weight = None
             gpu = True
             nic = True
-            computer_reservable = False
             reservation_free = True
+            disks_satisfied = True
 
             curr_round += 1
-            print(
-                "\tProgress: "
-                + "{:.2f}".format((curr_round / total_rounds) * 100)
-                + "%",
-                end="\r",
-            )
+            if curr_round % PROGRESS_INTERVAL == 0 or curr_round == total_rounds:
+                print(
+                    f"\tProgress: {curr_round / total_rounds * 100:.2f}%",
+                    end="\r",
+                    flush=True,
+                )
 
-            # Short circuit for Reservations, as this is where the majority of time
-            # goes into filtering
-            for link in computer["links"]:
-                if link["rel"] == "ReservationItem":
-                    computer_reservable = check_computer_reservable(session, link)
-            if not computer_reservable:
+            resources = computer_resources[computer["id"]]
+            if "cpus" in resources:
+                cpu_weight, core_weight = check_processor(
+                    resources["cpus"],
+                    resources["cores"],
+                    requirements[requirement]["cpu"],
+                    requirements[requirement]["cores"],
+                )
+            if "ram" in resources:
+                memory_weight = check_memory(
+                    resources["ram"], requirements[requirement]["ram"]
+                )
+            if not (cpu_weight or core_weight) or not memory_weight:
                 continue
 
             for link in computer["links"]:
-                if link["rel"] == "Item_DeviceProcessor":
-                    cpu_weight = check_cpus(
-                        session, link, requirements[requirement]["cpu"]
-                    )
-                    core_weight = check_cores(
-                        session, link, requirements[requirement]["cores"]
-                    )
-                    if not (cpu_weight or core_weight):
-                        break
-
-                elif link["rel"] == "Item_DeviceMemory":
-                    memory_weight = check_memory(
-                        session, link, requirements[requirement]["ram"]
-                    )
-                    if not memory_weight:
-                        break
-
-                elif (
+                if (
                     "gpu" in requirements[requirement]
                     and link["rel"] == "Item_DeviceGraphicCard"
                 ):
                     gpu = check_graphics(
-                        session, link, requirements[requirement]["gpu"]
+                        session,
+                        get_link(session, link, link_cache),
+                        requirements[requirement]["gpu"],
+                        link_cache,
                     )
                 elif (
                     "nic" in requirements[requirement]
                     and link["rel"] == "Item_DeviceNetworkCard"
                 ):
-                    nic = check_network(session, link, requirements[requirement]["nic"])
-            if (
-                not computer_reservable
-                or not (cpu_weight or core_weight)
-                or not memory_weight
-            ):
-                continue
-
-            if "disks" in requirements[requirement]:
-                disks_req = requirements[requirement]["disks"]
-                disks_req.sort(key=operator.itemgetter("storage"))
+                    nic = check_network(
+                        session,
+                        get_link(session, link, link_cache),
+                        requirements[requirement]["nic"],
+                        link_cache,
+                    )
 
-                disks_satisfied = check_disks(computer["id"], disks, disks_req)
+            if disks_req:
+                disks_satisfied = check_disks(
+                    computer["id"], disks_by_computer, disks_req
+                )
 
             if (
-                computer_reservable
-                and cpu_weight
+                cpu_weight
                 and core_weight
                 and memory_weight
                 and gpu
                 and nic
                 and disks_satisfied
             ):
-                for reservation in reservations:
-                    computer_key = "Computer " + str(computer["id"])
-                    if computer_key in reservations[reservation]:
-                        if (
-                            reservations[reservation]["Begins"]
-                            <= requirements[requirement]["start"]
-                            <= reservations[reservation]["Ends"]
-                        ) or (
-                            reservations[reservation]["Begins"]
-                            <= requirements[requirement]["end"]
-                            <= reservations[reservation]["Ends"]
-                        ):
-                            reservation_free = False
+                for begins, ends in reservations_by_computer.get(computer["id"], ()):
+                    if begins <= start <= ends or begins <= end <= ends:
+                        reservation_free = False
+                        break
                 if reservation_free:
                     total_weight = cpu_weight + core_weight + memory_weight
                     if requirement not in available:
@@ -246,7 +403,7 @@ def reservable(  # noqa: C901
 
     sorted_available = {}
     final_choices = {}
-    taken_machines = []
+    taken_machines = set()
     for requirement in available:
         sorted_requirement = sorted(
             available[requirement],
@@ -279,10 +436,11 @@ def reservable(  # noqa: C901
         if pick is not None:
             for choice in sorted_available[pick]:
                 if choice not in taken_machines:
-                    taken_machines.append(choice)
+                    taken_machines.add(choice)
                     final_choices[pick] = [choice, available[pick][choice]["name"]]
-                    del sorted_available[pick]
                     break
+            if pick in final_choices:
+                del sorted_available[pick]
     return available, final_choices
 
 
@@ -343,155 +501,153 @@ def print_final_decision(
         print("fulfilled: false")
 
 
-# NOTE: Need to replace this added glpi in the path.
-#       Why is that there in the href?
-def check_cpus(session: requests.sessions.Session, link: str, req_cpu: int) -> int:
-    """Check cpu requirements for a computer
+def check_processor(
+    total_cpus: int, total_cores: int, req_cpu: int, req_cores: int
+) -> Tuple[int, int]:
+    """Check cpu and core requirements for a computer
 
     Args:
-        session (requests.sessions.Session): The requests session object
-        link (str):       the GLPI link to the machine to check
+        total_cpus (int):  the amount of cpus of the machine to check
+        total_cores (int): the amount of cores of the machine to check
         req_cpu (int):    the amount of cpus required
-
-    Returns:
-        int:  on success returns the ratio of total cpus to required cpus
-        None: otherwise
-    """
-    cpus = check_field_without_range(session, link["href"].replace("/glpi", ""))
-    if len(cpus) >= req_cpu:
-        return len(cpus) / req_cpu
-
-    return None
-
-
-def check_cores(session: requests.sessions.Session, link: str, req_cores: int) -> int:
-    """Check core requirements for a computer
-
-    Args:
-        session (requests.sessions.Session): The requests session object
-        link (str):       the GLPI link to the machine to check
         req_cores (int):  the amount of cores required
 
     Returns:
-        int:  on success returns the ratio of total cores to required cores
-        None: otherwise
+        cpu_weight (int):  the ratio of total cpus to required cpus, None if the
+                           requirement isn't met
+        core_weight (int): the ratio of total cores to required cores, None if the
+                           requirement isn't met
     """
-    cpus = check_field_without_range(session, link["href"].replace("/glpi", ""))
-    total_cores = 0
-    for cpu in cpus:
-        total_cores += int(cpu["nbcores"])
+    cpu_weight = None
+    core_weight = None
+    if total_cpus >= req_cpu:
+        cpu_weight = total_cpus / req_cpu
     if total_cores >= req_cores:
-        return total_cores / req_cores
+        core_weight = total_cores / req_cores
 
-    return None
+    return cpu_weight, core_weight
 
 
-def check_memory(session: requests.sessions.Session, link: str, req_memory: int) -> int:
+def check_memory(total_ram: int, req_memory: int) -> int:
     """Check memory requirements for a computer
 
     Args:
-        session (requests.sessions.Session): The requests session object
-        link (str):       the GLPI link to the machine to check
+        total_ram (int):  the amount of memory of the machine to check (MB)
         req_memory (int): the amount of memory required (MB)
 
     Returns:
         int:  on success returns the ratio of total ram to required ram
         None: otherwise
     """
-    memory = check_field_without_range(session, link["href"].replace("/glpi", ""))
-    total_ram = 0
-    for dimm in memory:
-        total_ram += int(dimm["size"])
     if total_ram >= req_memory:
         return total_ram / req_memory
 
     return None
 
 
-def check_graphics(session: requests.sessions.Session, link: str, req_gpu: str) -> bool:
+def check_graphics(
+    session: requests.sessions.Session,
+    graphics: list,
+    req_gpu: str,
+    link_cache: dict,
+) -> bool:
     """Check graphics requirements for a computer
 
     Args:
         session (requests.sessions.Session): The requests session object
-        link (str):       the GLPI link to the machine to check
+        graphics (list):  the GLPI graphics card items of the machine to check
         req_gpu (str):    the name of the gpu to check
+        link_cache (dict): the GLPI responses fetched so far, keyed by href
 
     Returns:
         True: on nic meeting requirements, None otherwise
     """
-    graphics = check_field_without_range(session, link["href"].replace("/glpi", ""))
     for gpu in graphics:
         for link in gpu["links"]:
             if link["rel"] == "DeviceGraphicCard":
-                gpu_info = check_field_without_range(
-                    session, link["href"].replace("/glpi", "")
-                )
+                gpu_info = get_link(session, link, link_cache)
                 if req_gpu in gpu_info["designation"]:
                     return True
 
     return None
 
 
-def check_network(session: requests.sessions.Session, link: str, req_nic: str) -> bool:
+def check_network(
+    session: requests.sessions.Session,
+    nics: list,
+    req_nic: str,
+    link_cache: dict,
+) -> bool:
     """Check network requirements for a computer
 
     Args:
         session (requests.sessions.Session): The requests session object
-        link (str):       the GLPI link to the machine to check
+        nics (list):      the GLPI network card items of the machine to check
         req_nic (str):    the name of the nic to check
+        link_cache (dict): the GLPI responses fetched so far, keyed by href
 
     Returns:
         True: on nic meeting requirements, None otherwise
     """
-    nics = check_field_without_range(session, link["href"].replace("/glpi", ""))
     for nic in nics:
         for link in nic["links"]:
             if link["rel"] == "DeviceNetworkCard":
-                nic_info = check_field_without_range(
-                    session, link["href"].replace("/glpi", "")
-                )
+                nic_info = get_link(session, link, link_cache)
                 for model_link in nic_info["links"]:
                     if model_link["rel"] == "DeviceNetworkCardModel":
-                        model_info = check_field_without_range(
-                            session, model_link["href"].replace("/glpi", "")
-                        )
+                        model_info = get_link(session, model_link, link_cache)
                         if model_info["name"] and req_nic in model_info["name"]:
                             return True
 
     return None
 
 
-def check_disks(computer_id: str, disks: list, req_disks: list) -> bool:
+def index_disks(disks: list) -> dict:
+    """Group the GLPI disks by the computer they belong to
+
+    Args:
+        disks (list): the list of disks from GLPI
+
+    Returns:
+        disks_by_computer (dict): lists of disks keyed by computer ID
+    """
+    disks_by_computer = {}
+    for disk in disks:
+        if disk["itemtype"] == "Computer":
+            disks_by_computer.setdefault(disk["items_id"], []).append(disk)
+
+    return disks_by_computer
+
+
+def check_disks(computer_id: str, disks_by_computer: dict, req_disks: list) -> bool:
     """Check disk requirements for a computer
 
     Args:
-        computer_id (str): the computer's ID in GLPI
-        disks (list):      the list of disks from GLPI
-        req_disks (list):  the list of requirements for disks
+        computer_id (str):        the computer's ID in GLPI
+        disks_by_computer (dict): the disks from GLPI, keyed by computer ID
+        req_disks (list):         the list of requirements for disks
 
     Returns:
         True: on disks meeting requirements, False otherwise
     """
-    total_disks = 0
-    total_storage = 0
-
-    for disk in disks:
-        if disk["itemtype"] == "Computer" and disk["items_id"] == computer_id:
-            total_storage += int(disk["totalsize"])
-            total_disks += 1
-            for i in range(len(req_disks)):
-                valid_disk = False
-                req_disk = req_disks[i]
-                if req_disk["storage"] <= int(disk["totalsize"]):
-                    if "disk_type" in req_disk:
-                        if str(req_disk["disk_type"]) in disk["name"]:
-                            valid_disk = True
-                    else:
-                        valid_disk = True
-
-                if valid_disk:
-                    req_disks.pop(i)
-                    break
+    # Work on a copy, as satisfied requirements are removed below and the
+    # caller's list is reused for every computer.
+    req_disks = list(req_disks)
+
+    for disk in disks_by_computer.get(computer_id, ()):
+        disk_size = int(disk["totalsize"])
+        for i, req_disk in enumerate(req_disks):
+            if req_disk["storage"] > disk_size:
+                continue
+            if (
+                "disk_type" in req_disk
+                and str(req_disk["disk_type"]) not in disk["name"]
+            ):
+                continue
+            req_disks.pop(i)
+            break
+        if not req_disks:
+            return True
 
     if req_disks:
         return False
@@ -19,11 +19,10 @@ from common.sessionhandler import SessionHandler
 from common.urlinitialization import UrlInitialization
 from common.utils import (
     print_final_help,
-    get_reservations,
+    get_reservations_dict,
     check_fields,
 )
 from common.parser import argparser
-import yaml
 
 # Suppress InsecureRequestWarning caused by REST access without
 # certificate validation.
@@ -55,7 +54,7 @@ def main() -> None:
     urls = UrlInitialization(ip)
 
     with SessionHandler(user_token, urls, no_verify) as session:
-        reservations = yaml.safe_load(get_reservations(session, urls))
+        reservations = get_reservations_dict(session, urls)
         computers = check_fields(session, urls.COMPUTER_URL)
         network_equipment = check_fields(session, urls.NETWORK_EQUIPMENT_URL)
 
@@ -65,41 +64,36 @@ def main() -> None:
 
 
 def get_machines_reserved_with_tag(
-    computers: list, network_equipment: list, reservations: list, jira: str
+    computers: list, network_equipment: list, reservations: dict, jira: str
 ) -> None:
     """Get the machines reserved with the tag and print reservations
 
     Args:
-        computers (list):    the list of GLPI computers
-        reservations (list): the list of GLPI reservations
-        jira (str):          the jira tag to match
+        computers (list):         the list of GLPI computers
+        network_equipment (list): the list of GLPI network equipment
+        reservations (dict):      the GLPI reservations
+        jira (str):               the jira tag to match
     """
     print(
         "------------------------------------------------------------------"
         + "--------------\nChecking reserved computer tags\n----------------"
         + "----------------------------------------------------------------"
     )
-    for computer in computers:
-        computer = yaml.safe_load(computer)
-        computer_key = "Computer " + str(computer["id"])
-        for reservation in reservations:
-            if computer_key in reservations[reservation]:
-                reservation_split = reservations[reservation]["Comment"].split()
-                if reservation_split:
-                    reservation_jira = reservation_split[0]
-                    if jira in reservation_jira:
-                        print(reservations[reservation])
-
-    for equipment in network_equipment:
-        equipment = yaml.safe_load(equipment)
-        equipment_key = "NetworkEquipment " + str(equipment["id"])
-        for reservation in reservations:
-            if equipment_key in reservations[reservation]:
-                reservation_split = reservations[reservation]["Comment"].split()
-                if reservation_split:
-                    reservation_jira = reservation_split[0]
-                    if jira in reservation_jira:
-                        print(reservations[reservation])
+    # Scan the reservations once, matching them against the keys of every
+    # computer and network equipment, rather than once per machine.
+    machine_keys = {"Computer " + str(computer["id"]) for computer in computers}
+    machine_keys.update(
+        "NetworkEquipment " + str(equipment["id"]) for equipment in network_equipment
+    )
+    for reservation in reservations.values():
+        if machine_keys.isdisjoint(reservation):
+            continue
+        # Only the first word of the comment holds the JIRA tag.
+        reservation_split = reservation["Comment"].split(None, 1)
+        if reservation_split:
+            reservation_jira = reservation_split[0]
+            if jira in reservation_jira:
+                print(reservation)
 
     return
 
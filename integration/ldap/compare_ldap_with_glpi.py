@@ -3,8 +3,11 @@ import sys
 import re
 import os
 import argparse
+import hashlib
+import json
+import time
+from typing import Iterable, Iterator
 
-import yaml
 import requests
 
 sys.path.append("../..")
@@ -16,10 +19,21 @@ import urllib3
 from common.parser import argparser
 from common.sessionhandler import SessionHandler
 from common.urlinitialization import UrlInitialization
-from common.utils import check_fields, print_final_help
+from common.utils import WITHOUT_LINKS, check_fields, load_yaml, print_final_help
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Regular expression patterns for matching lines in the ldapsearch output
+DN_PATTERN = re.compile(r"^dn:\s*cn=([^,]+)", re.MULTILINE)
+OWNER_PATTERN = re.compile(r"^owner:\s*uid=([^,]+)", re.MULTILINE)
+MEMBER_PATTERN = re.compile(r"^uniqueMember:\s*uid=([^,]+)", re.MULTILINE)
+# Pattern for the LDAP groups already listed in a GLPI group comment
+ROVER_PATTERN = re.compile(r"Rover:\s*(\S+)")
+# Number of entries per page of ldapsearch results
+LDAP_PAGE_SIZE = 1000
+# Directory for cached ldapsearch results, see --ldap_cache_ttl
+LDAP_CACHE_DIR = os.path.expanduser("~/.cache/glpi-helper-scripts")
+
 
 def main():
     parser = argparser()
@@ -48,6 +62,16 @@ def main():
         help="Base to use in the ldap query (ex: 'company')",
         required=True,
     )
+    parser.parser.add_argument(
+        "--ldap_cache_ttl",
+        metavar="ldap_cache_ttl",
+        type=int,
+        default=0,
+        help=(
+            "reuse the LDAP users gathered by a previous run with the same config "
+            "if they are at most this many seconds old (default: 0, disabled)"
+        ),
+    )
     args = parser.parser.parse_args()
     ip = args.ip
     user_token = args.token
@@ -59,7 +83,9 @@ def main():
 
     ldap_server = args.ldap_server
 
-    group_map = gather_ldap_users(group_map, ldap_server, base_dn)
+    group_map = gather_ldap_users(
+        group_map, ldap_server, base_dn, cache_ttl=args.ldap_cache_ttl
+    )
 
     urls = UrlInitialization(ip)
     with SessionHandler(user_token, urls, no_verify) as session:
@@ -81,11 +107,13 @@ def parse_config_yaml(args: argparse.Namespace) -> dict:
     if os.path.isfile(args.ldap_config):
         # Process YAML/JSON file
         with open(args.ldap_config, "r") as config_path:
-            group_map = yaml.safe_load(config_path)
+            group_map = load_yaml(config_path)
     else:
-        # Process env var
-        yaml_content = os.getenv(args.ldap_config, "{}")
-        group_map = yaml.safe_load(yaml_content)
+        # Process env var, skipping the YAML loader entirely if it is unset
+        yaml_content = os.getenv(args.ldap_config)
+        if yaml_content is None:
+            return {}
+        group_map = load_yaml(yaml_content)
 
     return group_map
 
@@ -95,6 +123,7 @@ def gather_ldap_users(
     ldap_server: str,
     base_dn: str,
     ldap_attributes: list[str] = ["owner", "uniqueMember"],
+    cache_ttl: int = 0,
 ) -> dict:
     """Use ldapsearch to get all users from the specified LDAP groups
 
@@ -102,15 +131,31 @@ def gather_ldap_users(
         group_map (dict): User-defined dictionary w/ ldap groups to search
         ldap_server (str): Specifies the ldap server to search
         base_dn (str): Base to use in the ldap query (ex: 'company')
+        ldap_attributes (list[str]): LDAP attributes that hold the users
+        cache_ttl (int): Max age in seconds of cached results to reuse, 0 disables
+                         the cache
 
     Returns:
         dict: Group map with users for each group
     """
-    ldap_search_filter = "(|"
-    for group in group_map:
-        for ldap_group in group_map[group]["ldap"]:
-            ldap_search_filter += f"(cn={ldap_group})"
-    ldap_search_filter += ")"
+    if cache_ttl:
+        cache_path = get_ldap_cache_path(
+            group_map, ldap_server, base_dn, ldap_attributes
+        )
+        cached_group_map = read_ldap_cache(cache_path, cache_ttl)
+        if cached_group_map is not None:
+            print("Using cached LDAP results")
+            return cached_group_map
+
+    ldap_search_filter = (
+        "(|"
+        + "".join(
+            f"(cn={ldap_group})"
+            for mapping_info in group_map.values()
+            for ldap_group in mapping_info["ldap"]
+        )
+        + ")"
+    )
     ldap_username = ""
     ldap_password = ""
     ldap_search_base = f"ou=adhoc,ou=managedGroups,dc={base_dn},dc=com"
@@ -127,50 +172,154 @@ def gather_ldap_users(
         ldap_password,
         "-b",
         ldap_search_base,
+        # Page the results, so large searches aren't cut off by the server's
+        # size limit
+        "-E",
+        f"pr={LDAP_PAGE_SIZE}/noprompt",
         ldap_search_filter,
     ] + ldap_attributes
 
-    result = subprocess.check_output(cmd).decode("utf-8")
+    mappings_by_ldap_group = index_ldap_groups(group_map)
 
-    if result:
-        group_map = parse_ldap(result, group_map)
-    else:
+    # Parse each entry as ldapsearch prints it, rather than reading the whole
+    # response into memory first.
+    results = 0
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True) as ldapsearch:
+        for entry in read_ldap_entries(ldapsearch.stdout):
+            parse_ldap(entry, mappings_by_ldap_group, group_map)
+            results += 1
+    if ldapsearch.returncode:
+        raise subprocess.CalledProcessError(ldapsearch.returncode, cmd)
+
+    if not results:
         print("No results found.")
 
+    for mapping_info in group_map.values():
+        if "users" in mapping_info:
+            mapping_info["users"] = sorted(mapping_info["users"])
+
+    if cache_ttl:
+        write_ldap_cache(cache_path, group_map)
+
     return group_map
 
 
-def parse_ldap(result: str, group_map: dict) -> dict:
-    """Organizes LDAP response and modifies group map accordingly
+def get_ldap_cache_path(
+    group_map: dict, ldap_server: str, base_dn: str, ldap_attributes: list[str]
+) -> str:
+    """Get the cache file for an LDAP search, which is unique to its parameters
 
     Args:
-        result (str): Response from ldapsearch
         group_map (dict): User-defined dictionary w/ ldap groups to search
+        ldap_server (str): Specifies the ldap server to search
+        base_dn (str): Base to use in the ldap query (ex: 'company')
+        ldap_attributes (list[str]): LDAP attributes that hold the users
+
     Returns:
-        dict: Group map with users for each group
+        str: Path of the cache file
     """
-    groups = result.strip().split("\n\n")
-
-    # Regular expression patterns for matching lines
-    dn_pattern = re.compile(r"^dn:\s*cn=([^,]+)", re.MULTILINE)
-    owner_pattern = re.compile(r"^owner:\s*uid=([^,]+)", re.MULTILINE)
-    member_pattern = re.compile(r"^uniqueMember:\s*uid=([^,]+)", re.MULTILINE)
-
-    for group in groups:
-        dn_match = dn_pattern.search(group)
-        if dn_match:
-            # Extract the distinguished name
-            dn = dn_match.group(1)
-            for mapping_name, mapping_info in group_map.items():
-                for ldap_group in mapping_info["ldap"]:
-                    if ldap_group == dn:
-                        # Find all owners and members for this group
-                        owners = owner_pattern.findall(group)
-                        members = member_pattern.findall(group)
-                        # Store the results in the group_map
-                        if "users" not in group_map[mapping_name]:
-                            group_map[mapping_name]["users"] = []
-                        group_map[mapping_name]["users"] += list(set(owners + members))
+    search = json.dumps(
+        [group_map, ldap_server, base_dn, ldap_attributes], sort_keys=True
+    )
+    search_hash = hashlib.sha256(search.encode("utf-8")).hexdigest()
+    return os.path.join(LDAP_CACHE_DIR, f"ldap_{search_hash}.json")
+
+
+def read_ldap_cache(cache_path: str, cache_ttl: int) -> dict:
+    """Read the cached group map of an LDAP search if it is recent enough
+
+    Args:
+        cache_path (str): Path of the cache file
+        cache_ttl (int): Max age in seconds of the cache file
+
+    Returns:
+        dict: The cached group map, None if there is none or it is too old
+    """
+    try:
+        if time.time() - os.path.getmtime(cache_path) > cache_ttl:
+            return None
+        with open(cache_path, "r") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_ldap_cache(cache_path: str, group_map: dict) -> None:
+    """Cache the group map of an LDAP search
+
+    Args:
+        cache_path (str): Path of the cache file
+        group_map (dict): Group map with users for each group
+    """
+    os.makedirs(os.path.dirname(cache_path), mode=0o700, exist_ok=True)
+    with open(
+        os.open(cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w"
+    ) as cache_file:
+        json.dump(group_map, cache_file)
+
+
+def index_ldap_groups(group_map: dict) -> dict:
+    """Index the group map by LDAP group, so each LDAP result is matched directly
+
+    Args:
+        group_map (dict): User-defined dictionary w/ ldap groups to search
+
+    Returns:
+        dict: Names of the group map entries for each LDAP group
+    """
+    mappings_by_ldap_group = {}
+    for mapping_name, mapping_info in group_map.items():
+        for ldap_group in mapping_info["ldap"]:
+            mappings_by_ldap_group.setdefault(ldap_group, []).append(mapping_name)
+    return mappings_by_ldap_group
+
+
+def read_ldap_entries(lines: Iterable[str]) -> Iterator[str]:
+    """Split ldapsearch output into its entries, which are separated by blank lines
+
+    Args:
+        lines (Iterable[str]): Lines of the ldapsearch output
+
+    Yields:
+        str: Each LDAP entry
+    """
+    entry = []
+    for line in lines:
+        if line.strip():
+            entry.append(line)
+        elif entry:
+            yield "".join(entry)
+            entry = []
+    if entry:
+        yield "".join(entry)
+
+
+def parse_ldap(result: str, mappings_by_ldap_group: dict, group_map: dict) -> dict:
+    """Organizes an LDAP entry and modifies group map accordingly
+
+    Args:
+        result (str): An entry of the ldapsearch response
+        mappings_by_ldap_group (dict): Group map entries for each LDAP group
+        group_map (dict): User-defined dictionary w/ ldap groups to search
+    Returns:
+        dict: Group map with the set of users for each group
+    """
+    dn_match = DN_PATTERN.search(result)
+    if dn_match:
+        # Extract the distinguished name
+        dn = dn_match.group(1)
+        mapping_names = mappings_by_ldap_group.get(dn)
+        if not mapping_names:
+            return group_map
+        # Find all owners and members for this group
+        owners = OWNER_PATTERN.findall(result)
+        members = MEMBER_PATTERN.findall(result)
+        for mapping_name in mapping_names:
+            # Store the results in the group_map, as a set until every entry is
+            # parsed so users in several LDAP groups are only kept once
+            users = group_map[mapping_name].setdefault("users", set())
+            users.update(owners)
+            users.update(members)
     return group_map
 
 
@@ -184,40 +333,77 @@ def sync_ldap_with_glpi(
         urls (UrlInitialization): the URL object
         group_map (dict): User-defined dictionary w/ ldap groups to search
     """
-    all_users = check_fields(session, urls.USER_URL)
-    group_response_list = check_fields(session, urls.GROUP_URL)
+    # Only the fields of the users and groups are needed, not their links
+    all_users = check_fields(session, urls.USER_URL, WITHOUT_LINKS)
+    user_name_by_id = {user["id"]: user["name"] for user in all_users}
+    all_users_by_name = {user["name"]: user for user in all_users}
+    group_response_list = check_fields(session, urls.GROUP_URL, WITHOUT_LINKS)
+    group_memberships = get_group_memberships(session, urls)
     for group in group_response_list:
-        users_in_group = get_users_in_group(session, urls, str(group["id"]))
-
         if group["completename"] in group_map:
+            users_in_group = get_users_in_group(
+                session, urls, group_memberships.get(group["id"], []), user_name_by_id
+            )
+
             # add group names to comments
             update_group_comments(session, urls.GROUP_URL, group, group_map)
 
             add_missing_users_to_group(
-                session, urls.BASE_URL, group, users_in_group, group_map, all_users
+                session,
+                urls.BASE_URL,
+                group,
+                users_in_group,
+                group_map,
+                all_users_by_name,
             )
 
 
+def get_group_memberships(
+    session: requests.sessions.Session, urls: UrlInitialization
+) -> dict:
+    """Get the users of every GLPI group at once, rather than group by group
+
+    Args:
+        session (requests.sessions.Session): The requests session object
+        urls (UrlInitialization): The URL object
+
+    Returns:
+        dict: Contains the user IDs of each GLPI group, keyed by group ID
+    """
+    group_memberships = {}
+    for group_user in check_fields(session, urls.GROUP_USER_URL, WITHOUT_LINKS):
+        group_memberships.setdefault(group_user["groups_id"], []).append(
+            group_user["users_id"]
+        )
+    return group_memberships
+
+
 def get_users_in_group(
-    session: requests.sessions.Session, urls: UrlInitialization, group_id: str
+    session: requests.sessions.Session,
+    urls: UrlInitialization,
+    user_ids: list,
+    user_name_by_id: dict,
 ) -> list:
-    """Get all GLPI users in a specific GLPI group
+    """Get the names of the GLPI users in a specific GLPI group
 
     Args:
         session (requests.sessions.Session): The requests session object
         urls (UrlInitialization): The URL object
-        group_id (str): The ID of the GLPI group
+        user_ids (list): The IDs of the users in the GLPI group
+        user_name_by_id (dict): Names of the GLPI users already fetched, keyed by ID
 
     Returns:
         list: Contains all GLPI users in the specified group
     """
     users_in_group = []
-    users_response_list = check_fields(
-        session, f"{urls.GROUP_URL}{group_id}/Group_User"
-    )
-    for user in users_response_list:
-        user_info = session.get(f"{urls.USER_URL}{str(user['users_id'])}")
-        users_in_group.append(user_info.json()["name"])
+    for user_id in user_ids:
+        user_name = user_name_by_id.get(user_id)
+        if user_name is None:
+            # Only users missing from the user list (ex: in the trash) are
+            # looked up individually.
+            user_info = session.get(f"{urls.USER_URL}{str(user_id)}")
+            user_name = user_info.json()["name"]
+        users_in_group.append(user_name)
     return users_in_group
 
 
@@ -232,14 +418,18 @@ def update_group_comments(
         group (dict): GLPI group and its related fields that will be modified
         group_map (dict): User-defined dictionary w/ ldap groups to search
     """
+    existing_comment = group["comment"] or ""
+    existing_ldap_groups = set(ROVER_PATTERN.findall(existing_comment))
     comment = ""
     for ldap_group in group_map[group["completename"]]["ldap"]:
-        if ldap_group not in group["comment"]:
+        if ldap_group not in existing_ldap_groups:
             comment += f"Rover: {ldap_group}\n"
             print(f"Adding '{ldap_group}' to group comment")
-    if group["comment"] is not None:
-        # Append pre-existing comment
-        comment += f"{group['comment']}"
+    if not comment:
+        # Every LDAP group is already in the comment, nothing to update
+        return
+    # Append pre-existing comment
+    comment += existing_comment
     comment_post = {"comment": comment}
     session.put(
         group_url + str(group["id"]),
@@ -253,7 +443,7 @@ def add_missing_users_to_group(
     group: dict,
     users_in_group: list,
     group_map: dict,
-    all_users: list,
+    all_users_by_name: dict,
 ) -> None:
     """Add users to GLPI groups if they aren't already associated
 
@@ -263,16 +453,17 @@ def add_missing_users_to_group(
         group (dict): GLPI group and its related fields that will be modified
         users_in_group (list): Users already in the GLPI group
         group_map (dict): User-defined dictionary w/ ldap groups to search
-        all_users (list): All GLPI users
+        all_users_by_name (dict): All GLPI users, keyed by name
     """
     if "users" in group_map[group["completename"]]:
-        users_to_add = list(
+        users_to_add = sorted(
             set(group_map[group["completename"]]["users"]) - set(users_in_group)
         )
         if not users_to_add:
             print(f"no new users for {group['completename']}, proceeding to next group")
-        for user in all_users:
-            if user["name"] in users_to_add:
+        for user_name in users_to_add:
+            user = all_users_by_name.get(user_name)
+            if user:
                 print(
                     f"Adding {user['name']} to {group['completename']}: {group['id']}"
                 )
@@ -37,6 +37,16 @@ def main():
         help="Base to use in the ldap query (ex: 'company')",
         required=True,
     )
+    parser.add_argument(
+        "--ldap_cache_ttl",
+        metavar="ldap_cache_ttl",
+        type=int,
+        default=0,
+        help=(
+            "reuse the LDAP owners gathered by a previous run with the same config "
+            "if they are at most this many seconds old (default: 0, disabled)"
+        ),
+    )
     args = parser.parse_args()
     base_dn = args.base_dn
 
@@ -46,14 +56,17 @@ def main():
     ldap_server = args.ldap_server
 
     group_map = ldap.gather_ldap_users(
-        group_map, ldap_server, base_dn, ldap_attributes=["owner"]
+        group_map,
+        ldap_server,
+        base_dn,
+        ldap_attributes=["owner"],
+        cache_ttl=args.ldap_cache_ttl,
     )
 
-    owners = []
+    owners = set()
     for entry in group_map:
-        owners.extend(group_map[entry]['users'])
-
-    owners = list(set(owners))
+        owners.update(group_map[entry].get("users", []))
+    owners = sorted(owners)
 
     print("@redhat.com, ".join(owners) + "@redhat.com")
     print_final_help()
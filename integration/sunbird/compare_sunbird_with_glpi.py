@@ -15,18 +15,30 @@ import sys
 sys.path.append("../..")
 import argparse
 import smtplib
+from concurrent.futures import ThreadPoolExecutor
 from email.message import EmailMessage
 
 import requests
 import urllib3
-import yaml
+from requests.adapters import HTTPAdapter
 from common.sessionhandler import SessionHandler
 from common.urlinitialization import UrlInitialization, validate_url
-from common.utils import check_fields, print_final_help
+from common.utils import WITHOUT_LINKS, check_fields, load_yaml, print_final_help
 
 # Suppress InsecureRequestWarning caused by REST access without certificate validation.
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Number of serial numbers looked up in Sunbird per request.
+SUNBIRD_BATCH_SIZE = 500
+# Number of concurrent requests sent to Sunbird.
+SUNBIRD_MAX_WORKERS = 8
+# Column filters and selection shared by every Sunbird device search.
+SUNBIRD_DEVICE_COLUMNS = [
+    {"name": "tiSubclass", "filter": {"eq": "Standard"}},
+    {"name": "tiClass", "filter": {"eq": "Device"}},
+]
+SUNBIRD_SELECTED_COLUMNS = [{"name": "tiSerialNumber"}]
+
 
 def main() -> None:
     """Main function"""
@@ -111,7 +123,7 @@ def main() -> None:
 
     # Process General Config
     with open(args.general_config, "r") as config_path:
-        config_map = yaml.safe_load(config_path)
+        config_map = load_yaml(config_path)
 
     user_token = args.token
     ip = args.ip
@@ -128,33 +140,28 @@ def main() -> None:
 
     urls = UrlInitialization(ip)
 
-    with SessionHandler(user_token, urls, no_verify) as session:
-        headers = {"Accept": "application/json", "Content-Type": "application/json"}
+    sunbird_session = create_sunbird_session(sunbird_username, sunbird_password)
 
+    with SessionHandler(user_token, urls, no_verify) as session:
         sunbird_machines = get_sunbird_machines(
-            config_map, headers, sunbird_url, sunbird_username, sunbird_password
+            config_map, sunbird_session, sunbird_url
         )
 
         glpi_machines = get_glpi_machines(session, urls)
 
         glpi_machines_in_sunbird = get_glpi_machines_in_sunbird(
-            glpi_machines, headers, sunbird_url, sunbird_username, sunbird_password
+            glpi_machines, sunbird_session, sunbird_url
         )
 
         # Convert keys/serial numbers to upper case
-        upper_case_sunbird = [key.upper() for key in sunbird_machines.keys()]
-        upper_case_glpi = [key.upper() for key in glpi_machines.keys()]
-        upper_case_glpi_in_sunbird = [
-            key.upper() for key in glpi_machines_in_sunbird.keys()
-        ]
-
-        # Compare the two dictionaries in a case-insensitive manner
-        sunbird_only = set(upper_case_sunbird) - set(upper_case_glpi)
-        glpi_only = set(upper_case_glpi) - set(upper_case_glpi_in_sunbird)
+        upper_case_sunbird = set(map(str.upper, sunbird_machines))
+        upper_case_glpi = set(map(str.upper, glpi_machines))
+        upper_case_glpi_in_sunbird = set(map(str.upper, glpi_machines_in_sunbird))
 
-        # Output the results
-        sunbird_only_list = list(sunbird_only)
-        glpi_only_list = list(glpi_only)
+        # Compare the two dictionaries in a case-insensitive manner, sorting the
+        # results so the output is stable between runs
+        sunbird_only_list = sorted(upper_case_sunbird - upper_case_glpi)
+        glpi_only_list = sorted(upper_case_glpi - upper_case_glpi_in_sunbird)
 
         output = (
             f"There are {len(sunbird_only_list)} computers in Sunbird but not in GLPI:"
@@ -174,59 +181,126 @@ def main() -> None:
         print_final_help()
 
 
+def create_sunbird_session(username: str, password: str) -> requests.Session:
+    """Create a session for the Sunbird API, so every call reuses its connections
+
+    Args:
+        username (str): Sunbird username
+        password (str): Sunbird password
+
+    Returns:
+        sunbird_session (requests.Session): the Sunbird session object
+    """
+    sunbird_session = requests.Session()
+    sunbird_session.auth = (username, password)
+    sunbird_session.headers.update(
+        {"Accept": "application/json", "Content-Type": "application/json"}
+    )
+    sunbird_session.verify = False
+    adapter = HTTPAdapter(pool_maxsize=SUNBIRD_MAX_WORKERS)
+    sunbird_session.mount("http://", adapter)
+    sunbird_session.mount("https://", adapter)
+    return sunbird_session
+
+
+def search_sunbird_devices(
+    sunbird_session: requests.Session, sunbird_url: str, columns: list
+) -> list:
+    """Search the standard devices in Sunbird, getting their serial numbers
+
+    Args:
+        sunbird_session (requests.Session): the Sunbird session object
+        sunbird_url (str): URL of Sunbird instance
+        columns (list): column filters to add to the standard device ones
+
+    Returns:
+        list: the Sunbird items found
+    """
+    payload = {
+        "columns": SUNBIRD_DEVICE_COLUMNS + columns,
+        "selectedColumns": SUNBIRD_SELECTED_COLUMNS,
+        "customFieldByLabel": True,
+    }
+    sunbird_response = sunbird_session.post(
+        f"{sunbird_url}/api/v2/quicksearch/items", json=payload
+    )
+    return sunbird_response.json()["searchResults"]["items"]
+
+
 def get_sunbird_machines(
-    config_map: dict, headers: dict, sunbird_url: str, username: str, password: str
+    config_map: dict, sunbird_session: requests.Session, sunbird_url: str
 ) -> dict:
     """Get machines in Sunbird from user-provided locations and cabinets
 
     Args:
         config_map (dict): a user-provided dictionary of lab locations and cabinets
-        headers (dict): headers for API calls to Sunbird
+        sunbird_session (requests.Session): the Sunbird session object
         sunbird_url (str): URL of Sunbird instance
-        username (str): Sunbird username
-        password (str): Sunbird password
 
     Returns:
         sunbird_machines (dict): machines in Sunbird from specified locations
     """
 
     sunbird_machines = {}
+    locations = []
     for location in config_map:
-        payload = {
-            "columns": [
-                {"name": "tiSubclass", "filter": {"eq": "Standard"}},
-                {"name": "tiClass", "filter": {"eq": "Device"}},
-                {"name": "cmbLocation", "filter": {"eq": location}},
-                {
-                    "name": "cmbCabinet",
-                    "filter": {"in": config_map[location]["Cabinets"]},
-                },
-            ],
-            "selectedColumns": [
-                {"name": "tiSerialNumber"},
-            ],
-            "customFieldByLabel": True,
-        }
-
-        sunbird_response = requests.post(
-            f"{sunbird_url}/api/v2/quicksearch/items",
-            headers=headers,
-            json=payload,
-            verify=False,
-            auth=(username, password),
+        if config_map[location].get("Cabinets"):
+            locations.append(location)
+        else:
+            # An empty "in" filter would not match the location's cabinets
+            print(f"No cabinets configured for {location}, skipping it")
+
+    # The locations are independent, so query them concurrently.
+    with ThreadPoolExecutor(max_workers=SUNBIRD_MAX_WORKERS) as executor:
+        location_machines = executor.map(
+            lambda location: get_sunbird_location_machines(
+                location,
+                config_map[location]["Cabinets"],
+                sunbird_session,
+                sunbird_url,
+            ),
+            locations,
         )
-        sunbird_json = sunbird_response.json()["searchResults"]["items"]
+        for sunbird_dict in location_machines:
+            sunbird_machines.update(sunbird_dict)
+    return sunbird_machines
 
-        # Only get machines with serial numbers
-        machines_with_serial = [
-            computer for computer in sunbird_json if "tiSerialNumber" in computer
-        ]
 
-        sunbird_dict = {
-            computer["tiSerialNumber"]: computer for computer in machines_with_serial
-        }
-        sunbird_machines.update(sunbird_dict)
-    return sunbird_machines
+def get_sunbird_location_machines(
+    location: str,
+    cabinets: list,
+    sunbird_session: requests.Session,
+    sunbird_url: str,
+) -> dict:
+    """Get machines in Sunbird from the cabinets of a single location
+
+    Args:
+        location (str): the lab location to search
+        cabinets (list): the cabinets of the location to search
+        sunbird_session (requests.Session): the Sunbird session object
+        sunbird_url (str): URL of Sunbird instance
+
+    Returns:
+        sunbird_dict (dict): machines in Sunbird from the location, keyed by serial
+    """
+    sunbird_json = search_sunbird_devices(
+        sunbird_session,
+        sunbird_url,
+        [
+            {"name": "cmbLocation", "filter": {"eq": location}},
+            {"name": "cmbCabinet", "filter": {"in": cabinets}},
+        ],
+    )
+
+    # Only get machines with serial numbers
+    machines_with_serial = [
+        computer for computer in sunbird_json if "tiSerialNumber" in computer
+    ]
+
+    sunbird_dict = {
+        computer["tiSerialNumber"]: computer for computer in machines_with_serial
+    }
+    return sunbird_dict
 
 
 def get_glpi_machines(
@@ -241,7 +315,8 @@ def get_glpi_machines(
     Returns:
         glpi_machines (dict): machines in GLPI
     """
-    computers = check_fields(session, urls.COMPUTER_URL)
+    # Only the serial numbers are needed, so leave out the links of each computer
+    computers = check_fields(session, urls.COMPUTER_URL, WITHOUT_LINKS)
     glpi_machines = {
         computer["serial"]: computer
         for computer in computers
@@ -252,43 +327,38 @@ def get_glpi_machines(
 
 
 def get_glpi_machines_in_sunbird(
-    glpi_machines: dict, headers: dict, sunbird_url: str, username: str, password: str
+    glpi_machines: dict, sunbird_session: requests.Session, sunbird_url: str
 ) -> dict:
     """Get all machines that are in both GLPI and Sunbird
 
     Args:
         glpi_machines (dict): All machines that are in GLPI
-        headers (dict): headers for API calls to Sunbird
+        sunbird_session (requests.Session): the Sunbird session object
         sunbird_url (str): URL of Sunbird instance
-        username (str): Sunbird username
-        password (str): Sunbird password
 
     Returns:
        glpi_machines_in_sunbird (dict): machines that are in both GLPI and Sunbird
     """
-    payload = {
-        "columns": [
-            {"name": "tiSubclass", "filter": {"eq": "Standard"}},
-            {"name": "tiClass", "filter": {"eq": "Device"}},
-            {"name": "tiSerialNumber", "filter": {"in": list(glpi_machines.keys())}},
-        ],
-        "selectedColumns": [
-            {"name": "tiSerialNumber"},
-        ],
-        "customFieldByLabel": True,
-    }
-
-    computer_response = requests.post(
-        f"{sunbird_url}/api/v2/quicksearch/items",
-        headers=headers,
-        json=payload,
-        verify=False,
-        auth=(username, password),
-    )
-    computer_json = computer_response.json()["searchResults"]["items"]
-    glpi_machines_in_sunbird = {
-        computer["tiSerialNumber"]: computer for computer in computer_json
-    }
+    # Query the serial numbers in batches, keeping each request and the filter
+    # Sunbird runs for it bounded.
+    serial_numbers = list(glpi_machines)
+    glpi_machines_in_sunbird = {}
+    for index in range(0, len(serial_numbers), SUNBIRD_BATCH_SIZE):
+        computer_json = search_sunbird_devices(
+            sunbird_session,
+            sunbird_url,
+            [
+                {
+                    "name": "tiSerialNumber",
+                    "filter": {
+                        "in": serial_numbers[index : index + SUNBIRD_BATCH_SIZE]
+                    },
+                }
+            ],
+        )
+        glpi_machines_in_sunbird.update(
+            {computer["tiSerialNumber"]: computer for computer in computer_json}
+        )
     return glpi_machines_in_sunbird
 
 
@@ -16,16 +16,24 @@ sys.path.append("..")
 import common.format_dicts as format_dicts
 
 # Imports.
+import glob
+import os
+import re
 import requests
 import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
 from common.utils import (
     print_final_help,
     check_and_post,
+    check_and_post_items,
     check_and_post_processor,
     check_and_post_processor_item,
     check_and_post_device_memory_item,
     check_and_post_network_port,
-    check_fields,
+    get_computers_by_serial,
+    prefetch_fields,
 )
 from common.sessionhandler import SessionHandler
 from common.urlinitialization import UrlInitialization
@@ -39,6 +47,33 @@ import yaml
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Directory where the kernel exposes the DMI strings read by dmidecode.
+DMI_SYSFS_PATH = "/sys/class/dmi/id/"
+# Commands gathering the local machine information, keyed by what they gather.
+LOCAL_COMMANDS = {
+    "hostnamectl": ["hostnamectl"],
+    "networks": ["ifconfig"],
+    "ram": ["dmidecode", "--type", "memory"],
+    "disks": ["parted", "-l", "-s"],
+    # A single lshw run for the NICs and GPUs, as each run probes all hardware
+    "lshw": ["lshw", "-class", "network", "-class", "display"],
+}
+# Max number of ethtool processes run at once.
+ETHTOOL_MAX_WORKERS = 16
+# PCI devices of the machine, and the class code prefix of processing accelerators.
+PCI_SYSFS_PATH = "/sys/bus/pci/devices/"
+ACCELERATOR_PCI_CLASS = "0x1200"
+# Sizes printed by dmidecode and parted, ex: "16 GB" or "480GB", and their units.
+# Decimal factors are used for both, as the sizes already stored in GLPI are.
+SIZE_PATTERN = re.compile(r"([\d.]+)\s*(\w*)")
+SIZE_UNITS_IN_MB = {"kB": 0.001, "MB": 1, "GB": 1000, "TB": 1000000}
+# Locations of the PCI ID database used by lspci, which differ by distribution.
+PCI_IDS_PATHS = [
+    "/usr/share/hwdata/pci.ids",
+    "/usr/share/misc/pci.ids",
+    "/usr/share/pci.ids",
+]
+
 
 def main() -> None:
     """Main function"""
@@ -93,35 +128,165 @@ def main() -> None:
     with open(args.general_config, "r") as config_path:
         config_map = yaml.safe_load(config_path)
 
-    if "ACCELERATOR_IDS" in config_map:
-        global ACCELERATOR_IDS
-        ACCELERATOR_IDS = config_map["ACCELERATOR_IDS"]
-
     ip = args.ip
     user_token = args.token
     no_verify = args.no_verify
     switch_config = args.switch_config
-    global TEST
-    TEST = args.experiment
-    global PUT
-    PUT = args.put
-    global COMPUTER_ID
-    COMPUTER_ID = args.computer_id
     overwrite = args.overwrite
+    test = args.experiment
+    put = args.put
+    computer_id = args.computer_id
+    accelerator_ids = config_map.get("ACCELERATOR_IDS", {})
 
     urls = UrlInitialization(ip)
     switch_info = Switches(switch_config)
     with SessionHandler(user_token, urls, no_verify) as session:
-        post_to_glpi(session, urls, switch_info, overwrite)
+        post_to_glpi(
+            session,
+            urls,
+            switch_info,
+            overwrite,
+            test,
+            put,
+            computer_id,
+            accelerator_ids,
+        )
 
     print_final_help()
 
 
+def get_dmi_string(sysfs_name: str, dmidecode_keyword: str) -> str:
+    """Get a DMI string of the machine. It is read from sysfs, which avoids
+       running dmidecode, falling back to dmidecode if it isn't available there.
+
+    Args:
+        sysfs_name (str): Name of the file in /sys/class/dmi/id
+        dmidecode_keyword (str): Keyword passed to dmidecode -s
+
+    Returns:
+        str: The DMI string
+    """
+    try:
+        with open(DMI_SYSFS_PATH + sysfs_name, "r") as dmi_file:
+            return dmi_file.read().strip()
+    except OSError:
+        return subprocess.check_output(
+            ["dmidecode", "-s", dmidecode_keyword], encoding="utf-8"
+        ).strip()
+
+
+def get_cpu_info() -> dict:
+    """Get the processor information from lscpu, using its JSON output when lscpu
+       supports it (util-linux 2.30 and later).
+
+    Returns:
+        dict: The lscpu fields and their data
+    """
+    try:
+        lscpu_output = subprocess.check_output(
+            ["lscpu", "-J"], stderr=subprocess.DEVNULL, encoding="utf-8"
+        )
+    except subprocess.CalledProcessError:
+        lscpu_output = subprocess.check_output(["lscpu"]).splitlines()
+        return format_dicts.strip_dict(lscpu_output, ": ")
+    return format_dicts.strip_lscpu_json_dict(lscpu_output)
+
+
+def get_accelerators() -> dict:
+    """Get the processing accelerators (PCI class 0x1200) of the machine from sysfs.
+
+    Returns:
+        dict: The device ID and manufacturer of each accelerator, keyed by PCI slot
+    """
+    accelerator_dict = {}
+    for device_path in sorted(glob.glob(PCI_SYSFS_PATH + "*")):
+        with open(os.path.join(device_path, "class"), "r") as class_file:
+            if not class_file.read().startswith(ACCELERATOR_PCI_CLASS):
+                continue
+        with open(os.path.join(device_path, "vendor"), "r") as vendor_file:
+            vendor_id = vendor_file.read().strip()[2:]
+        with open(os.path.join(device_path, "device"), "r") as device_file:
+            device_id = device_file.read().strip()[2:]
+        accelerator_dict[os.path.basename(device_path)] = {
+            "device": device_id,
+            "manufacturer": get_pci_vendor_name(vendor_id),
+        }
+    return accelerator_dict
+
+
+def get_pci_vendor_name(vendor_id: str) -> str:
+    """Get the name of a PCI vendor from the PCI ID database, as lspci shows it.
+
+    Args:
+        vendor_id (str): The PCI vendor ID, ex: "8086"
+
+    Returns:
+        str: The vendor name, or the vendor ID if it isn't in the database
+    """
+    for pci_ids_path in PCI_IDS_PATHS:
+        try:
+            with open(pci_ids_path, "r", encoding="utf-8", errors="replace") as ids:
+                for line in ids:
+                    # Vendor lines are the only ones that aren't indented.
+                    if line.startswith(vendor_id + "  "):
+                        return line[len(vendor_id) :].strip()
+            return vendor_id
+        except OSError:
+            continue
+    return vendor_id
+
+
+def get_network_speed(name: str) -> Union[str, int]:
+    """Get the speed of a network interface from ethtool.
+
+    Args:
+        name (str): Name of the network interface
+
+    Returns:
+        Union[str, int]: The speed in Mb/s, 0 if it is unknown
+    """
+    try:
+        network_speed = subprocess.check_output(["ethtool", name], encoding="utf-8")
+    except subprocess.CalledProcessError:
+        return 0
+    network_speed_dict = format_dicts.strip_decoded_dict(network_speed, ":")
+    if "Speed" in network_speed_dict and network_speed_dict["Speed"][-4:] == "Mb/s":
+        return network_speed_dict["Speed"][0:-4]
+    return 0
+
+
+def get_size_in_mb(size: str) -> int:
+    """Convert a size printed by dmidecode or parted, ex: "16 GB" or "480GB", to
+       the whole number of MB GLPI stores.
+
+    Args:
+        size (str): The size and its unit
+
+    Returns:
+        int: The size in MB
+    """
+    size_match = SIZE_PATTERN.match(size)
+    value, unit = size_match.group(1), size_match.group(2)
+    # Sizes without a known unit are already in MB.
+    factor = SIZE_UNITS_IN_MB.get(unit, 1)
+    if value.isdigit() and isinstance(factor, int):
+        return int(value) * factor
+    size_in_mb = round(float(value) * factor)
+    # Don't round a size below 1 MB, ex: "500kB", down to an empty one.
+    if size_in_mb == 0 and float(value) > 0:
+        return 1
+    return size_in_mb
+
+
 def post_to_glpi(  # noqa: C901
     session: requests.sessions.Session,
     urls: UrlInitialization,
     switch_info: Switches,
     overwrite: bool,
+    test: bool,
+    put: bool,
+    computer_id: str,
+    accelerator_ids: dict,
 ) -> None:
     """A method to post the JSON created to GLPI. This method calls numerous helper
        functions which create different parts of the JSON required, get fields from
@@ -132,102 +297,155 @@ def post_to_glpi(  # noqa: C901
         urls (UrlInitialization object): the URL object
         switch_info (Switches object): Contains information about lab switches
         overwrite (boolean): flagged to overwrite existing names
+        test (boolean): flagged to append '_TEST' to the serial number
+        put (boolean): flagged to only use PUT requests for the computer
+        computer_id (str): ID of the computer to PUT, if put is flagged
+        accelerator_ids (dict): Names of the processing accelerators by device ID
     """
     print("Getting local machine information\n")
-    # Get the hostnamectl output as an example, splitting on newlines.
-    hostnamectl_output = subprocess.check_output(["hostnamectl"]).splitlines()
-    # Get the serial number of the machine.
-    serial_number = (
-        subprocess.check_output(["dmidecode", "-s", "system-serial-number"])
-        .strip()
-        .decode()
-    )
-    # Append TEST to the serial number if the TEST flag is set.
-    if TEST:
-        serial_number = serial_number + "_TEST"
-    # Get the manufacturer of the machine.
-    computer_type = (
-        subprocess.check_output(["dmidecode", "-s", "system-manufacturer"])
-        .strip()
-        .decode()
-    )
-    # Get the model of the machine.
-    computer_model = (
-        subprocess.check_output(["dmidecode", "-s", "system-product-name"])
-        .strip()
-        .decode()
-    )
-    # Get the uuid.
-    uuid = subprocess.check_output(["dmidecode", "-s", "system-uuid"]).strip().decode()
-    # Get the processor(s).
-    lscpu_output = subprocess.check_output(["lscpu"]).splitlines()
-    # Get the OS.
-    os = subprocess.check_output(["cat", "/etc/os-release"]).strip().decode()
-    # Get the kernel version.
-    kernel = subprocess.check_output(["uname", "-r"]).strip().decode()
-    # Get the architecure version.
-    architecture = subprocess.check_output(["uname", "-m"]).strip().decode()
+    # The commands are independent of each other, so run them all at once rather
+    # than waiting on each in turn.
+    with ThreadPoolExecutor(max_workers=len(LOCAL_COMMANDS) + 2) as executor:
+        command_futures = {
+            name: executor.submit(subprocess.check_output, command, encoding="utf-8")
+            for name, command in LOCAL_COMMANDS.items()
+        }
+        cpu_future = executor.submit(get_cpu_info)
+        accelerators_future = executor.submit(get_accelerators)
+
+        # Get the serial number of the machine.
+        serial_number = get_dmi_string("product_serial", "system-serial-number")
+        # Append TEST to the serial number if the test flag is set.
+        if test:
+            serial_number = serial_number + "_TEST"
+        # Get the manufacturer of the machine.
+        computer_type = get_dmi_string("sys_vendor", "system-manufacturer")
+        # Get the model of the machine.
+        computer_model = get_dmi_string("product_name", "system-product-name")
+        # Get the uuid. The kernel prints it in lowercase, unlike dmidecode.
+        uuid = get_dmi_string("product_uuid", "system-uuid").upper()
+        # Get the OS.
+        with open("/etc/os-release", "r") as os_release_file:
+            os_release = os_release_file.read().strip()
+        # Get the kernel version and architecture.
+        uname = os.uname()
+        kernel = uname.release
+        architecture = uname.machine
+
+        outputs = {name: future.result() for name, future in command_futures.items()}
+        cpu_dict = cpu_future.result()
+        accelerator_dict = accelerators_future.result()
+
+    # The command output is decoded as it is read, only strip it.
+    # Get the hostnamectl output as an example.
+    hostnamectl_output = outputs["hostnamectl"]
     # Get all interfaces.
-    networks = subprocess.check_output(["ifconfig"]).strip().decode()
+    networks = outputs["networks"].strip()
     # Get RAM information.
-    ram = subprocess.check_output(["dmidecode", "--type", "memory"]).strip().decode()
+    ram = outputs["ram"].strip()
     # Get volume information.
-    disks = subprocess.check_output(["parted", "-l", "-s"]).strip().decode()
-    # Get NIC information.
-    nics = subprocess.check_output(["lshw", "-class", "network"]).strip().decode()
-    # Get GPU information.
-    gpus = subprocess.check_output(["lshw", "-C", "display"]).strip().decode()
-
-    # Get lspci output.
-    lspci = subprocess.Popen(["lspci"], stdout=subprocess.PIPE)
-    try:
-        grep_lspci = subprocess.check_output(
-            ["grep", "accelerators"], stdin=lspci.stdout
-        )
-        lspci.wait()
-        accelerators = grep_lspci.strip().decode()
-    except subprocess.CalledProcessError:
-        accelerators = ""
+    disks = outputs["disks"].strip()
+    # Get GPU and NIC information.
+    gpus, nics = format_dicts.split_lshw_classes(
+        outputs["lshw"].strip(), "*", "display"
+    )
 
     # Strip leading whitespace and create dictionaries of the entries.
-    hostnamectl_dict = format_dicts.strip_dict(hostnamectl_output, ": ")
-    cpu_dict = format_dicts.strip_dict(lscpu_output, ": ")
-    os_dict = format_dicts.strip_decoded_dict(os, "=")
+    hostnamectl_dict = format_dicts.strip_decoded_dict(hostnamectl_output, ": ")
+    os_dict = format_dicts.strip_decoded_dict(os_release, "=")
     networks_dict = format_dicts.strip_network_dict(networks, ": ")
     ram_dict = format_dicts.strip_ram_dict(ram, ": ")
     disk_dict = format_dicts.strip_disks_dict(disks, ": ")
     nics_dict = format_dicts.strip_nics_dict(nics, "*", ": ")
     gpus_dict = format_dicts.strip_gpu_dict(gpus, "*", ": ")
-    accelerator_dict = format_dicts.strip_accelerator_dict(accelerators, " ")
 
     # Call helper functions to check fields present in GLPI for the various
     # machine fields to be populated and post them to GLPI if necessary.
     #
     # NOTE: Different helper functions exist because of different syntax,
     #       field names, and formatting in the API.
+    #
+    # The GLPI fields at each URL are fetched once and reused by every check,
+    # as the same URLs (ex: manufacturers) are checked for many components. The
+    # tables are independent, so fetch all of those needed at once up front.
+    fields_cache = {}
+    prefetch_urls = [
+        urls.COMPUTER_TYPE_URL,
+        urls.MANUFACTURER_URL,
+        urls.COMPUTER_MODEL_URL,
+        urls.OPERATING_SYSTEM_URL,
+        urls.OPERATING_SYSTEM_VERSION_URL,
+        urls.OPERATING_SYSTEM_ARCHITECTURE_URL,
+        urls.OPERATING_SYSTEM_KERNEL_VERSION_URL,
+        urls.OPERATING_SYSTEM_ITEM_URL,
+    ]
+    if nics_dict:
+        prefetch_urls += [
+            urls.DEVICE_NETWORK_CARD_MODEL_URL,
+            urls.DEVICE_NETWORK_CARD_URL,
+            urls.DEVICE_NETWORK_CARD_ITEM_URL,
+        ]
+    if gpus_dict:
+        prefetch_urls += [
+            urls.DEVICE_GRAPHICS_CARD_MODEL_URL,
+            urls.DEVICE_GRAPHICS_CARD_URL,
+            urls.DEVICE_GRAPHICS_CARD_ITEM_URL,
+        ]
+    if networks_dict:
+        prefetch_urls.append(urls.NETWORK_PORT_ETHERNET_URL)
+    if ram_dict:
+        prefetch_urls += [urls.DEVICE_MEMORY_TYPE_URL, urls.DEVICE_MEMORY_URL]
+    if disk_dict:
+        prefetch_urls.append(urls.DISK_ITEM_URL)
+    if accelerator_dict:
+        prefetch_urls += [
+            urls.DEVICE_GENERIC_TYPE_URL,
+            urls.DEVICE_GENERIC_URL,
+            urls.DEVICE_GENERIC_ITEM_URL,
+        ]
+    prefetch_fields(session, prefetch_urls, fields_cache)
     computer_type_id = check_and_post(
         session,
         urls.COMPUTER_TYPE_URL,
         {"name": hostnamectl_dict["Chassis"].capitalize()},
+        glpi_fields_cache=fields_cache,
     )
     manufacturers_id = check_and_post(
-        session, urls.MANUFACTURER_URL, {"name": computer_type}
+        session,
+        urls.MANUFACTURER_URL,
+        {"name": computer_type},
+        glpi_fields_cache=fields_cache,
     )
     computer_model_id = check_and_post(
-        session, urls.COMPUTER_MODEL_URL, {"name": computer_model}
+        session,
+        urls.COMPUTER_MODEL_URL,
+        {"name": computer_model},
+        glpi_fields_cache=fields_cache,
     )
     processors_id = check_and_post_processor(session, cpu_dict, urls.CPU_URL, urls)
     operating_system_id = check_and_post(
-        session, urls.OPERATING_SYSTEM_URL, {"name": os_dict["NAME"]}
+        session,
+        urls.OPERATING_SYSTEM_URL,
+        {"name": os_dict["NAME"]},
+        glpi_fields_cache=fields_cache,
     )
     operating_system_version_id = check_and_post(
-        session, urls.OPERATING_SYSTEM_VERSION_URL, {"name": os_dict["VERSION"]}
+        session,
+        urls.OPERATING_SYSTEM_VERSION_URL,
+        {"name": os_dict["VERSION"]},
+        glpi_fields_cache=fields_cache,
     )
     operating_system_architecture_id = check_and_post(
-        session, urls.OPERATING_SYSTEM_ARCHITECTURE_URL, {"name": architecture}
+        session,
+        urls.OPERATING_SYSTEM_ARCHITECTURE_URL,
+        {"name": architecture},
+        glpi_fields_cache=fields_cache,
     )
     operating_system_kernel_version_id = check_and_post(
-        session, urls.OPERATING_SYSTEM_KERNEL_VERSION_URL, {"name": kernel}
+        session,
+        urls.OPERATING_SYSTEM_KERNEL_VERSION_URL,
+        {"name": kernel},
+        glpi_fields_cache=fields_cache,
     )
 
     # The final dictionary for the machine JSON to post.
@@ -249,26 +467,23 @@ def post_to_glpi(  # noqa: C901
     # Add the system uuid.
     glpi_post["uuid"] = uuid
 
-    # Get the list of computers and check the serial number. If the serial
-    # number matches then use a PUT to modify the cooresponding computer by ID.
-    glpi_fields_list = check_fields(session, urls.COMPUTER_URL)
-
-    for glpi_computer in glpi_fields_list:
-        if glpi_computer["serial"] == serial_number:
-            global PUT
-            global COMPUTER_ID
-            PUT = True
-            COMPUTER_ID = glpi_computer["id"]
-            if glpi_computer["name"] != glpi_post["name"] and not overwrite:
-                glpi_post["name"] = glpi_computer["name"]
-            break
-
-    # If the PUT flag is set then PUT the data to GLPI to modify the existing
+    # Look up the computer with the serial number. If there is one then use a
+    # PUT to modify the cooresponding computer by ID.
+    for glpi_computer in get_computers_by_serial(
+        session, urls.COMPUTER_URL, serial_number
+    ):
+        put = True
+        computer_id = glpi_computer["id"]
+        if glpi_computer["name"] != glpi_post["name"] and not overwrite:
+            glpi_post["name"] = glpi_computer["name"]
+        break
+
+    # If the put flag is set then PUT the data to GLPI to modify the existing
     # machine, otherwise POST it to create a new machine.
     print("Sending JSON to GLPI server:")
-    if PUT:
+    if put:
         computer_response = session.put(
-            url=urls.COMPUTER_URL + str(COMPUTER_ID), json={"input": glpi_post}
+            url=urls.COMPUTER_URL + str(computer_id), json={"input": glpi_post}
         )
         print(str(computer_response) + "\n")
     else:
@@ -276,7 +491,7 @@ def post_to_glpi(  # noqa: C901
             url=urls.COMPUTER_URL, json={"input": glpi_post}
         )
         print(str(computer_response) + "\n")
-        COMPUTER_ID = computer_response.json()["id"]
+        computer_id = computer_response.json()["id"]
 
     # NOTE: The 'check_and_post' style helper methods called below (for the
     # processor(s), operating system, switches, memory, and network) come after
@@ -285,7 +500,7 @@ def post_to_glpi(  # noqa: C901
         session,
         cpu_dict,
         urls.CPU_ITEM_URL,
-        COMPUTER_ID,
+        computer_id,
         processors_id,
         "Computer",
         int(cpu_dict["Socket(s)"]),
@@ -296,7 +511,7 @@ def post_to_glpi(  # noqa: C901
         session,
         urls.OPERATING_SYSTEM_ITEM_URL,
         {
-            "items_id": COMPUTER_ID,
+            "items_id": computer_id,
             "itemtype": "Computer",
             "operatingsystems_id": operating_system_id,
         },
@@ -305,6 +520,7 @@ def post_to_glpi(  # noqa: C901
             "operatingsystemarchitectures_id": operating_system_architecture_id,
             "operatingsystemkernelversions_id": operating_system_kernel_version_id,
         },
+        glpi_fields_cache=fields_cache,
     )
 
     # Create network devices.
@@ -320,6 +536,7 @@ def post_to_glpi(  # noqa: C901
                 session,
                 urls.DEVICE_NETWORK_CARD_MODEL_URL,
                 {"name": nics_dict[name]["product"]},
+                glpi_fields_cache=fields_cache,
             )
 
         vendor = 0
@@ -329,7 +546,10 @@ def post_to_glpi(  # noqa: C901
         manufacturers_id = vendor
         if vendor:
             manufacturers_id = check_and_post(
-                session, urls.MANUFACTURER_URL, {"name": vendor}
+                session,
+                urls.MANUFACTURER_URL,
+                {"name": vendor},
+                glpi_fields_cache=fields_cache,
             )
         nic_id = check_and_post(
             session,
@@ -340,21 +560,23 @@ def post_to_glpi(  # noqa: C901
                 "manufacturers_id": manufacturers_id,
                 "devicenetworkcardmodels_id": nic_model_id,
             },
+            glpi_fields_cache=fields_cache,
         )
         nic_item_id = check_and_post(
             session,
             urls.DEVICE_NETWORK_CARD_ITEM_URL,
             {
-                "items_id": COMPUTER_ID,
+                "items_id": computer_id,
                 "itemtype": "Computer",
                 "devicenetworkcards_id": nic_id,
                 "mac": nics_dict[name]["serial"],
             },
+            glpi_fields_cache=fields_cache,
         )
         nic_ids[name] = nic_item_id
 
     # Create graphics devices.
-    gpu_ids = {}
+    gpu_items = []
     for name in gpus_dict:
         """bandwidth = ''
         if 'capacity' in nics_dict[name]:
@@ -366,6 +588,7 @@ def post_to_glpi(  # noqa: C901
                 session,
                 urls.DEVICE_GRAPHICS_CARD_MODEL_URL,
                 {"name": gpus_dict[name]["product"]},
+                glpi_fields_cache=fields_cache,
             )
 
         vendor = 0
@@ -375,7 +598,10 @@ def post_to_glpi(  # noqa: C901
         manufacturers_id = vendor
         if vendor:
             manufacturers_id = check_and_post(
-                session, urls.MANUFACTURER_URL, {"name": vendor}
+                session,
+                urls.MANUFACTURER_URL,
+                {"name": vendor},
+                glpi_fields_cache=fields_cache,
             )
 
         gpu_id = check_and_post(
@@ -386,29 +612,37 @@ def post_to_glpi(  # noqa: C901
                 "manufacturers_id": manufacturers_id,
                 "devicegraphiccardmodels_id": gpu_model_id,
             },
+            glpi_fields_cache=fields_cache,
         )
-        gpu_item_id = check_and_post(
-            session,
-            urls.DEVICE_GRAPHICS_CARD_ITEM_URL,
+        gpu_items.append(
             {
-                "items_id": COMPUTER_ID,
+                "items_id": computer_id,
                 "itemtype": "Computer",
                 "devicegraphiccards_id": gpu_id,
-            },
+            }
         )
-        gpu_ids[name] = gpu_item_id
+    check_and_post_items(
+        session,
+        urls.DEVICE_GRAPHICS_CARD_ITEM_URL,
+        gpu_items,
+        glpi_fields_cache=fields_cache,
+    )
 
     # Create network ports by logical number based off the networks dictionary
     # queried from the machine.
-    global switch_dict
     switch_dict = {}
     logical_number = 0
+    # Query the speed of every interface at once, before any port is posted.
+    with ThreadPoolExecutor(max_workers=ETHTOOL_MAX_WORKERS) as executor:
+        network_speeds = dict(
+            zip(networks_dict, executor.map(get_network_speed, networks_dict))
+        )
     for name in networks_dict:
         print(name)
         network_port_id = check_and_post_network_port(
             session,
             urls.NETWORK_PORT_URL,
-            COMPUTER_ID,
+            computer_id,
             "Computer",
             logical_number,
             name,
@@ -418,17 +652,7 @@ def post_to_glpi(  # noqa: C901
             urls,
             switch_info,
         )
-        try:
-            network_speed = subprocess.check_output(["ethtool", name]).strip().decode()
-            network_speed_dict = format_dicts.strip_decoded_dict(network_speed, ":")
-            speed = 0
-            if (
-                "Speed" in network_speed_dict
-                and network_speed_dict["Speed"][-4:] == "Mb/s"
-            ):
-                speed = network_speed_dict["Speed"][0:-4]
-        except subprocess.CalledProcessError:
-            speed = 0
+        speed = network_speeds[name]
 
         nic_id = 0
         if name in nic_ids:
@@ -442,104 +666,127 @@ def post_to_glpi(  # noqa: C901
                 "items_devicenetworkcards_id": nic_id,
                 "speed": speed,
             },
+            glpi_fields_cache=fields_cache,
         )
         logical_number += 1
 
-    # Create Memory types.
-    memory_item_dict = {}
-    for memory in ram_dict:
-        if (
-            "Type" in ram_dict[memory]
-            and ram_dict[memory]["Size"] != "No Module Installed"
-        ):
-            if ram_dict[memory]["Size"].split()[1] == "GB":
-                ram_size = int(ram_dict[memory]["Size"].split()[0]) * 1000
-            else:
-                ram_size = int(ram_dict[memory]["Size"].split()[0])
-            memory_type_id = check_and_post(
-                session, urls.DEVICE_MEMORY_TYPE_URL, {"name": ram_dict[memory]["Type"]}
-            )
-            manufacturers_id = check_and_post(
-                session,
-                urls.MANUFACTURER_URL,
-                {"name": ram_dict[memory]["Manufacturer"]},
-            )
-            memory_id = check_and_post(
-                session,
-                urls.DEVICE_MEMORY_URL,
-                {
-                    "designation": ram_dict[memory]["Part Number"],
-                    "frequence": ram_dict[memory]["Speed"].split()[0],
-                    "manufacturers_id": manufacturers_id,
-                    "size_default": ram_size,
-                    "devicememorytypes_id": memory_type_id,
-                },
-            )
-            if memory_id in memory_item_dict:
-                memory_item_dict[memory_id]["quantity"] += 1
-            else:
-                memory_item_dict[memory_id] = {}
-                memory_item_dict[memory_id]["quantity"] = 1
-                memory_item_dict[memory_id]["size"] = ram_size
-    # Create Memory Items.
-    for memory_id in memory_item_dict:
+    # Group identical memory modules, parsing each once, so every distinct
+    # module is only checked in GLPI once.
+    memory_modules = Counter()
+    for memory in ram_dict.values():
+        if "Type" in memory and memory["Size"] != "No Module Installed":
+            ram_size = get_size_in_mb(memory["Size"])
+            memory_modules[
+                (
+                    memory["Type"],
+                    memory["Manufacturer"],
+                    memory["Part Number"],
+                    memory["Speed"].split()[0],
+                    ram_size,
+                )
+            ] += 1
+
+    # Create Memory types and Memory Items.
+    for memory_module, quantity in memory_modules.items():
+        memory_type, manufacturer, part_number, speed, ram_size = memory_module
+        memory_type_id = check_and_post(
+            session,
+            urls.DEVICE_MEMORY_TYPE_URL,
+            {"name": memory_type},
+            glpi_fields_cache=fields_cache,
+        )
+        manufacturers_id = check_and_post(
+            session,
+            urls.MANUFACTURER_URL,
+            {"name": manufacturer},
+            glpi_fields_cache=fields_cache,
+        )
+        memory_id = check_and_post(
+            session,
+            urls.DEVICE_MEMORY_URL,
+            {
+                "designation": part_number,
+                "frequence": speed,
+                "manufacturers_id": manufacturers_id,
+                "size_default": ram_size,
+                "devicememorytypes_id": memory_type_id,
+            },
+            glpi_fields_cache=fields_cache,
+        )
         check_and_post_device_memory_item(
             session,
             urls.DEVICE_MEMORY_ITEM_URL,
-            COMPUTER_ID,
+            computer_id,
             "Computer",
             memory_id,
-            memory_item_dict[memory_id]["size"],
-            memory_item_dict[memory_id]["quantity"],
+            ram_size,
+            quantity,
         )
 
-    # Create Disk items.
+    # Create Disk items. Disks are matched on their name and mountpoint, and the
+    # size is updated in place, so a disk whose size was stored differently by an
+    # earlier run is corrected rather than duplicated.
+    disk_items = []
+    disk_sizes = []
     for disk_id in disk_dict:
-        size = 0
-        if disk_dict[disk_id]["Size"][-2:] == "GB":
-            size = float(disk_dict[disk_id]["Size"][:-2]) * 1000
-        else:
-            size = float(disk_dict[disk_id]["Size"][:-2])
-
-        check_and_post(
-            session,
-            urls.DISK_ITEM_URL,
+        disk_items.append(
             {
-                "items_id": COMPUTER_ID,
+                "items_id": computer_id,
                 "itemtype": "Computer",
                 "name": disk_id,
-                "totalsize": size,
                 "mountpoint": disk_dict[disk_id]["Part"],
-            },
+            }
         )
+        disk_sizes.append({"totalsize": get_size_in_mb(disk_dict[disk_id]["Size"])})
+    check_and_post_items(
+        session,
+        urls.DISK_ITEM_URL,
+        disk_items,
+        glpi_fields_cache=fields_cache,
+        additional_information=disk_sizes,
+    )
 
+    # Create accelerator items.
+    accelerator_items = []
     for accelerator in accelerator_dict:
+        if accelerator_dict[accelerator]["device"] not in accelerator_ids:
+            print(f"Skipping accelerator {accelerator}, its device ID isn't mapped")
+            continue
         manufacturers_id = check_and_post(
             session,
             urls.MANUFACTURER_URL,
             {"name": accelerator_dict[accelerator]["manufacturer"]},
+            glpi_fields_cache=fields_cache,
         )
         type_id = check_and_post(
-            session, urls.DEVICE_GENERIC_TYPE_URL, {"name": "Processing accelerators"}
+            session,
+            urls.DEVICE_GENERIC_TYPE_URL,
+            {"name": "Processing accelerators"},
+            glpi_fields_cache=fields_cache,
         )
         generic_id = check_and_post(
             session,
             urls.DEVICE_GENERIC_URL,
             {
-                "designation": ACCELERATOR_IDS[accelerator_dict[accelerator]["device"]],
+                "designation": accelerator_ids[accelerator_dict[accelerator]["device"]],
                 "devicegenerictypes_id": type_id,
                 "manufacturers_id": manufacturers_id,
             },
+            glpi_fields_cache=fields_cache,
         )
-        check_and_post(
-            session,
-            urls.DEVICE_GENERIC_ITEM_URL,
+        accelerator_items.append(
             {
-                "items_id": COMPUTER_ID,
+                "items_id": computer_id,
                 "itemtype": "Computer",
                 "devicegenerics_id": generic_id,
-            },
+            }
         )
+    check_and_post_items(
+        session,
+        urls.DEVICE_GENERIC_ITEM_URL,
+        accelerator_items,
+        glpi_fields_cache=fields_cache,
+    )
 
     return
 
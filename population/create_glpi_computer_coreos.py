@@ -16,8 +16,10 @@
 import sys
 
 sys.path.append("..")
-import pexpect
+import re
 import requests
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from common.utils import (
     print_final_help,
     check_and_post,
@@ -25,7 +27,8 @@ from common.utils import (
     check_and_post_processor_item,
     check_and_post_network_port,
     check_and_post_device_memory_item,
-    check_fields,
+    get_computers_by_serial,
+    prefetch_fields,
 )
 import common.format_dicts as format_dicts
 from common.sessionhandler import SessionHandler
@@ -33,6 +36,45 @@ from common.urlinitialization import UrlInitialization
 from common.switches import Switches
 from common.parser import argparser
 
+DMI_SYSFS_PATH = "/sys/devices/virtual/dmi/id/"
+DMI_FIELDS = ["product_serial", "sys_vendor", "product_name", "product_uuid"]
+# The commands run on the CoreOS node, keyed by the section of their output. Only
+# the command reading root-only files (the DMI serial number and UUID) uses sudo.
+GATHER_COMMANDS = {
+    "hostnamectl": "hostnamectl",
+    # grep prints every DMI field as "<path>:<value>", with a single sudo.
+    "dmi": "sudo grep -s . " + " ".join(DMI_SYSFS_PATH + field for field in DMI_FIELDS),
+    # The JSON output of lscpu needs util-linux 2.30 or later.
+    "lscpu": "lscpu -J 2>/dev/null || lscpu",
+    "os": "cat /etc/os-release",
+    "kernel": "uname -r",
+    "architecture": "uname -m",
+    "networks": "ip -j addr show",
+    "ram": "cat /proc/meminfo",
+    "disks": "lsblk -J -b -o NAME,SIZE,TYPE",
+    # grep prints the speed of every interface as "<path>:<speed>".
+    "speeds": "grep -Hs . /sys/class/net/*/speed",
+}
+# The commands run for every interface ($n) on the CoreOS node, with their output
+# in the "<section>:<interface>" section.
+GATHER_INTERFACE_COMMANDS = {
+    # The sysfs path of NICs goes through their PCI device.
+    "path": "readlink /sys/class/net/$n",
+}
+# Share one SSH connection to the node between runs of this script, so that only
+# the first run in ControlPersist seconds pays for the connection handshake.
+SSH_MULTIPLEX_OPTIONS = [
+    "-o",
+    "ControlMaster=auto",
+    "-o",
+    "ControlPath=~/.ssh/glpi-%C",
+    "-o",
+    "ControlPersist=600",
+]
+SECTION_PATTERN = re.compile(r"\n===(\S+)===\n")
+GATHER_TIMEOUT = 120
+LOOKUP_MAX_WORKERS = 8
+
 
 def main() -> None:
     """Main function"""
@@ -99,18 +141,24 @@ def main() -> None:
     ip = args.ip
     switch_config = args.switch_config
     no_verify = args.no_verify
-    global TEST
-    TEST = args.experiment
-    global PUT
-    PUT = args.put
     overwrite = args.overwrite
+    test = args.experiment
+    put = args.put
 
     urls = UrlInitialization(ip)
     switch_info = Switches(switch_config)
 
     with SessionHandler(user_token, urls, no_verify) as session:
         post_to_glpi(
-            session, rsa_key, server_username, server_ip, urls, switch_info, overwrite
+            session,
+            rsa_key,
+            server_username,
+            server_ip,
+            urls,
+            switch_info,
+            overwrite,
+            test,
+            put,
         )
 
     print_final_help()
@@ -126,6 +174,8 @@ def post_to_glpi(  # noqa: C901
     urls: UrlInitialization,
     switch_info: Switches,
     overwrite: bool,
+    test: bool,
+    put: bool,
 ) -> None:
     """A method to post the JSON created to GLPI. This method calls numerous helper
        functions which create different parts of the JSON required, get fields from
@@ -139,112 +189,163 @@ def post_to_glpi(  # noqa: C901
         urls (UrlInitialization object): the URL object
         switch_info (Switches object): Contains information about lab switches
         overwrite (bool): Flagged to overwrite existing names
+        test (bool): Flagged to append '_TEST' to the serial number
+        put (bool): Flagged to only use PUT requests
     """
     print("Getting machine information\n")
-    ssh_command = "ssh -o StrictHostKeyChecking=no "
+    ssh_command = ["ssh", "-o", "StrictHostKeyChecking=no"] + SSH_MULTIPLEX_OPTIONS
     if rsa_key:
-        ssh_command += "-i " + rsa_key + " "
-    child = pexpect.spawn(ssh_command + server_username + "@" + server_ip)
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    child.sendline("sudo hostnamectl")
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    # Get the hostnamectl output as an example, splitting on newlines.
-    hostnamectl_output = child.after.splitlines()
+        ssh_command += ["-i", rsa_key]
+    ssh_command.append(server_username + "@" + server_ip)
+    # The GLPI fields at each URL are fetched once and reused by every check, as
+    # the same URLs (ex: manufacturers) are checked for several components. The
+    # tables the machine's own fields are checked against don't depend on the
+    # node, so they are fetched while the node is being queried.
+    fields_cache = {}
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        sections_future = executor.submit(gather_sections, ssh_command)
+        prefetch_fields(
+            session,
+            [
+                urls.COMPUTER_TYPE_URL,
+                urls.MANUFACTURER_URL,
+                urls.COMPUTER_MODEL_URL,
+                urls.OPERATING_SYSTEM_URL,
+                urls.OPERATING_SYSTEM_VERSION_URL,
+                urls.OPERATING_SYSTEM_ARCHITECTURE_URL,
+                urls.OPERATING_SYSTEM_KERNEL_VERSION_URL,
+            ],
+            fields_cache,
+        )
+        sections = sections_future.result()
+    dmi_dict = {}
+    for line in sections["dmi"].splitlines():
+        path, _, value = line.partition(":")
+        dmi_dict[path[len(DMI_SYSFS_PATH) :]] = value.strip()
     # Get the serial number of the machine.
-    child.sendline("sudo cat /sys/devices/virtual/dmi/id/product_serial")
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    serial_number = child.after.strip().decode().split("\r\n")[1]
-    # Append TEST to the serial number if the TEST flag is set.
-    if TEST:
+    serial_number = dmi_dict.get("product_serial", "")
+    # Append TEST to the serial number if the test flag is set.
+    if test:
         serial_number = serial_number + "_TEST"
     # Get the manufacturer of the machine.
-    child.sendline("sudo cat /sys/devices/virtual/dmi/id/sys_vendor")
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    computer_type = child.after.strip().decode().split("\r\n")[1]
+    computer_type = dmi_dict.get("sys_vendor", "")
     # Get the model of the machine.
-    child.sendline("sudo cat /sys/devices/virtual/dmi/id/product_name")
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    computer_model = child.after.strip().decode().split("\r\n")[1]
+    computer_model = dmi_dict.get("product_name", "")
     # Get the uuid.
-    child.sendline("sudo cat /sys/devices/virtual/dmi/id/product_uuid")
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    uuid = child.after.strip().decode().split("\r\n")[1]
-    # Get the processor(s).
-    child.sendline("sudo lscpu")
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    lscpu_output = child.after.splitlines()
-    # Get the OS.
-    child.sendline("sudo cat /etc/os-release")
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    os = child.after.strip().decode()
+    uuid = dmi_dict.get("product_uuid", "")
     # Get the kernel version.
-    child.sendline("sudo uname -r")
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    kernel = child.after.strip().decode().split("\r\n")[1]
+    kernel = sections["kernel"].strip()
     # Get the architecure version.
-    child.sendline("sudo uname -m")
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    architecture = child.after.strip().decode().split("\r\n")[1]
-    # Get all interfaces.
-    child.sendline("sudo ifconfig")
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    networks = child.after.strip().decode()
-    # Get RAM information.
-    child.sendline(
-        'sudo awk \'$3=="kB"{$2=$2/1024;$3="MB"} 1\' /proc/meminfo | column -t'
-    )
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    ram = child.after.strip().decode()
-    # Get volume information.
-    child.sendline("sudo lsblk")
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    disks = child.after.strip().decode()
-    # Get NIC information.
-    child.sendline(
-        "sudo ls -l /sys/class/net | grep pci | rev | cut -d'/' -f1 | rev| xargs -n1 "
-        + "ip a show dev"
-    )
-    child.expect(".*\$ ", timeout=30)  # noqa: W605
-    nics = child.after.strip().decode()
+    architecture = sections["architecture"].strip()
+    # Get the speed of each interface in Mb/s, as read from sysfs. Interfaces
+    # without a link report -1, or fail to report a speed at all.
+    speeds = {}
+    for line in sections["speeds"].splitlines():
+        path, _, speed = line.partition(":")
+        if speed.isdigit():
+            speeds[path.split("/")[-2]] = speed
+    # Get the interfaces backed by a PCI device.
+    nics = [
+        section[len("path:") :]
+        for section, output in sections.items()
+        if section.startswith("path:") and "pci" in output
+    ]
 
     # Strip leading whitespace and create dictionaries of the entries.
-    hostnamectl_dict = format_dicts.strip_dict(hostnamectl_output, ": ")
-    cpu_dict = format_dicts.strip_dict(lscpu_output, ": ")
-    os_dict = format_dicts.strip_decoded_dict(os, "=")
-    networks_dict = format_dicts.strip_network_dict(networks, ": ", True)
-    ram_dict = format_dicts.strip_ram_dict_coreos(ram, ": ")
-    disk_dict = format_dicts.strip_disks_dict_coreos(disks, "\n")
-    nics_dict = format_dicts.strip_nics_dict_coreos(nics, "\n", ": <", child)
+    hostnamectl_dict = format_dicts.strip_decoded_dict(sections["hostnamectl"], ": ")
+    if sections["lscpu"].lstrip().startswith("{"):
+        cpu_dict = format_dicts.strip_lscpu_json_dict(sections["lscpu"])
+    else:
+        cpu_dict = format_dicts.strip_decoded_dict(sections["lscpu"], ": ")
+    os_dict = format_dicts.strip_decoded_dict(sections["os"], "=")
+    networks_dict = format_dicts.strip_ip_network_dict(sections["networks"])
+    ram_dict = format_dicts.strip_ram_dict_coreos(sections["ram"])
+    disk_dict = format_dicts.strip_lsblk_disks_dict(sections["disks"])
+    nics_dict = format_dicts.strip_ip_nics_dict(sections["networks"], nics, speeds)
+
+    # Fetch the rest of the GLPI tables needed for the machine's components at
+    # once, rather than one after the other on first use. This also fills the
+    # fields cache before it is shared between the NIC threads below.
+    prefetch_urls = [urls.OPERATING_SYSTEM_ITEM_URL]
+    if nics_dict:
+        prefetch_urls += [
+            urls.DEVICE_NETWORK_CARD_MODEL_URL,
+            urls.DEVICE_NETWORK_CARD_URL,
+            urls.DEVICE_NETWORK_CARD_ITEM_URL,
+        ]
+    if networks_dict:
+        prefetch_urls.append(urls.NETWORK_PORT_ETHERNET_URL)
+    if "MemTotal:" in ram_dict:
+        prefetch_urls += [urls.DEVICE_MEMORY_TYPE_URL, urls.DEVICE_MEMORY_URL]
+    if disk_dict:
+        prefetch_urls.append(urls.DISK_ITEM_URL)
+    prefetch_fields(session, prefetch_urls, fields_cache)
 
     # Call helper functions to check fields present in GLPI for the various
     # machine fields to be populated and post them to GLPI if necessary.
     #
     # NOTE: Different helper functions exist because of different syntax,
     #       field names, and formatting in the API.
-    computer_type_id = check_and_post(
-        session,
-        urls.COMPUTER_TYPE_URL,
-        {"name": hostnamectl_dict["Chassis"].capitalize()},
-    )
-    manufacturers_id = check_and_post(
-        session, urls.MANUFACTURER_URL, {"name": computer_type}
-    )
-    computer_model_id = check_and_post(
-        session, urls.COMPUTER_MODEL_URL, {"name": computer_model}
-    )
-    processors_id = check_and_post_processor(session, cpu_dict, urls.CPU_URL, urls)
-    operating_system_id = check_and_post(
-        session, urls.OPERATING_SYSTEM_URL, {"name": os_dict["NAME"]}
-    )
-    operating_system_version_id = check_and_post(
-        session, urls.OPERATING_SYSTEM_VERSION_URL, {"name": os_dict["VERSION"]}
-    )
-    operating_system_architecture_id = check_and_post(
-        session, urls.OPERATING_SYSTEM_ARCHITECTURE_URL, {"name": architecture}
-    )
-    operating_system_kernel_version_id = check_and_post(
-        session, urls.OPERATING_SYSTEM_KERNEL_VERSION_URL, {"name": kernel}
-    )
+    #
+    # The lookups are independent of each other, so they are sent concurrently.
+    with ThreadPoolExecutor(max_workers=LOOKUP_MAX_WORKERS) as executor:
+        computer_type_future = executor.submit(
+            check_and_post,
+            session,
+            urls.COMPUTER_TYPE_URL,
+            {"name": hostnamectl_dict["Chassis"].capitalize()},
+            glpi_fields_cache=fields_cache,
+        )
+        computer_model_future = executor.submit(
+            check_and_post,
+            session,
+            urls.COMPUTER_MODEL_URL,
+            {"name": computer_model},
+            glpi_fields_cache=fields_cache,
+        )
+        operating_system_future = executor.submit(
+            check_and_post,
+            session,
+            urls.OPERATING_SYSTEM_URL,
+            {"name": os_dict["NAME"]},
+            glpi_fields_cache=fields_cache,
+        )
+        operating_system_version_future = executor.submit(
+            check_and_post,
+            session,
+            urls.OPERATING_SYSTEM_VERSION_URL,
+            {"name": os_dict["VERSION"]},
+            glpi_fields_cache=fields_cache,
+        )
+        operating_system_architecture_future = executor.submit(
+            check_and_post,
+            session,
+            urls.OPERATING_SYSTEM_ARCHITECTURE_URL,
+            {"name": architecture},
+            glpi_fields_cache=fields_cache,
+        )
+        operating_system_kernel_version_future = executor.submit(
+            check_and_post,
+            session,
+            urls.OPERATING_SYSTEM_KERNEL_VERSION_URL,
+            {"name": kernel},
+            glpi_fields_cache=fields_cache,
+        )
+        # The processor lookup may create the CPU vendor as a manufacturer, so it
+        # waits for the computer manufacturer rather than racing it.
+        manufacturers_id = check_and_post(
+            session,
+            urls.MANUFACTURER_URL,
+            {"name": computer_type},
+            glpi_fields_cache=fields_cache,
+        )
+        processors_id = check_and_post_processor(session, cpu_dict, urls.CPU_URL, urls)
+    computer_type_id = computer_type_future.result()
+    computer_model_id = computer_model_future.result()
+    operating_system_id = operating_system_future.result()
+    operating_system_version_id = operating_system_version_future.result()
+    operating_system_architecture_id = operating_system_architecture_future.result()
+    operating_system_kernel_version_id = operating_system_kernel_version_future.result()
 
     # The final dictionary for the machine JSON to post.
     glpi_post = {}
@@ -265,34 +366,46 @@ def post_to_glpi(  # noqa: C901
     # Add the system uuid.
     glpi_post["uuid"] = uuid
 
-    # Get the list of computers and check the serial number. If the serial
-    # number matches then use a PUT to modify the cooresponding computer by ID.
-    glpi_fields_list = check_fields(session, urls.COMPUTER_URL)
-
-    for glpi_computer in glpi_fields_list:
-        if glpi_computer["serial"] == serial_number:
-            global PUT
-            global COMPUTER_ID
-            PUT = True
-            COMPUTER_ID = glpi_computer["id"]
-            if glpi_computer["name"] != glpi_post["name"] and not overwrite:
-                glpi_post["name"] = glpi_computer["name"]
-            break
-
-    # If the PUT flag is set then PUT the data to GLPI to modify the existing
-    # machine, otherwise POST it to create a new machine.
-    print("Sending JSON to GLPI server:")
-    if PUT:
+    # Look up the computer with the serial number. If there is one then use a
+    # PUT to modify the cooresponding computer by ID, unless it already matches.
+    up_to_date = False
+    computer_id = None
+    for glpi_computer in get_computers_by_serial(
+        session, urls.COMPUTER_URL, serial_number
+    ):
+        put = True
+        computer_id = glpi_computer["id"]
+        if glpi_computer["name"] != glpi_post["name"] and not overwrite:
+            glpi_post["name"] = glpi_computer["name"]
+        up_to_date = all(
+            glpi_computer.get(key) == value for key, value in glpi_post.items()
+        )
+        break
+
+    # If the put flag is set then PUT the data to GLPI to modify the existing
+    # machine, otherwise POST it to create a new machine. There is nothing to PUT
+    # to if no computer has the serial number, so create it instead.
+    if put and computer_id is None:
+        print(
+            f"No computer with serial number {serial_number} to PUT to, "
+            + "creating a new computer instead..."
+        )
+        put = False
+    if up_to_date:
+        print(f"Computer {computer_id} is up to date\n")
+    elif put:
+        print("Sending JSON to GLPI server:")
         computer_response = session.put(
-            url=urls.COMPUTER_URL + str(COMPUTER_ID), json={"input": glpi_post}
+            url=urls.COMPUTER_URL + str(computer_id), json={"input": glpi_post}
         )
         print(str(computer_response) + "\n")
     else:
+        print("Sending JSON to GLPI server:")
         computer_response = session.post(
             url=urls.COMPUTER_URL, json={"input": glpi_post}
         )
         print(str(computer_response) + "\n")
-        COMPUTER_ID = computer_response.json()["id"]
+        computer_id = computer_response.json()["id"]
 
     # NOTE: The 'check_and_post' style helper methods called below (for the
     # processor(s), operating system, switches, memory, and network) come after
@@ -301,7 +414,7 @@ def post_to_glpi(  # noqa: C901
         session,
         cpu_dict,
         urls.CPU_ITEM_URL,
-        COMPUTER_ID,
+        computer_id,
         processors_id,
         "Computer",
         int(cpu_dict["Socket(s)"]),
@@ -311,7 +424,7 @@ def post_to_glpi(  # noqa: C901
         session,
         urls.OPERATING_SYSTEM_ITEM_URL,
         {
-            "items_id": COMPUTER_ID,
+            "items_id": computer_id,
             "itemtype": "Computer",
             "operatingsystems_id": operating_system_id,
         },
@@ -320,56 +433,65 @@ def post_to_glpi(  # noqa: C901
             "operatingsystemarchitectures_id": operating_system_architecture_id,
             "operatingsystemkernelversions_id": operating_system_kernel_version_id,
         },
+        glpi_fields_cache=fields_cache,
     )
-    # Create network devices.
-    nic_ids = {}
-    for name in nics_dict:
-        bandwidth = ""
-        if "capacity" in nics_dict[name]:
-            bandwidth = nics_dict[name]["capacity"]
-
-        nic_model_id = 0
-        if "product" in nics_dict[name]:
-            nic_model_id = check_and_post(
-                session,
-                urls.DEVICE_NETWORK_CARD_MODEL_URL,
-                {"name": nics_dict[name]["product"]},
-            )
-
-        vendor = 0
-        if "vendor" in nics_dict[name]:
-            vendor = nics_dict[name]["vendor"]
-
-        manufacturers_id = vendor
-        if vendor:
-            manufacturers_id = check_and_post(
-                session, urls.MANUFACTURER_URL, {"name": vendor}
-            )
+    # Create network devices. Each NIC model and vendor is looked up once, before
+    # the NICs themselves are posted concurrently, so that NICs sharing a model or
+    # vendor do not race to create it.
+    nic_model_ids = {
+        product: check_and_post(
+            session,
+            urls.DEVICE_NETWORK_CARD_MODEL_URL,
+            {"name": product},
+            glpi_fields_cache=fields_cache,
+        )
+        for product in {
+            nic["product"] for nic in nics_dict.values() if "product" in nic
+        }
+    }
+    nic_manufacturer_ids = {
+        vendor: check_and_post(
+            session,
+            urls.MANUFACTURER_URL,
+            {"name": vendor},
+            glpi_fields_cache=fields_cache,
+        )
+        for vendor in {nic["vendor"] for nic in nics_dict.values() if nic.get("vendor")}
+    }
+
+    def post_nic(name: str) -> int:
         nic_id = check_and_post(
             session,
             urls.DEVICE_NETWORK_CARD_URL,
             {
                 "designation": name,
-                "bandwidth": bandwidth,
-                "manufacturers_id": manufacturers_id,
-                "devicenetworkcardmodels_id": nic_model_id,
+                "bandwidth": nics_dict[name].get("capacity", ""),
+                "manufacturers_id": nic_manufacturer_ids.get(
+                    nics_dict[name].get("vendor"), 0
+                ),
+                "devicenetworkcardmodels_id": nic_model_ids.get(
+                    nics_dict[name].get("product"), 0
+                ),
             },
+            glpi_fields_cache=fields_cache,
         )
-        nic_item_id = check_and_post(
+        return check_and_post(
             session,
             urls.DEVICE_NETWORK_CARD_ITEM_URL,
             {
-                "items_id": COMPUTER_ID,
+                "items_id": computer_id,
                 "itemtype": "Computer",
                 "devicenetworkcards_id": nic_id,
                 "mac": nics_dict[name]["serial"],
             },
+            glpi_fields_cache=fields_cache,
         )
-        nic_ids[name] = nic_item_id
+
+    with ThreadPoolExecutor(max_workers=LOOKUP_MAX_WORKERS) as executor:
+        nic_ids = dict(zip(nics_dict, executor.map(post_nic, nics_dict)))
 
     # Create network ports by logical number based off the networks dictionary
     # queried from the machine.
-    global switch_dict
     switch_dict = {}
     logical_number = 0
     for name in networks_dict:
@@ -377,7 +499,7 @@ def post_to_glpi(  # noqa: C901
         network_port_id = check_and_post_network_port(
             session,
             urls.NETWORK_PORT_URL,
-            COMPUTER_ID,
+            computer_id,
             "Computer",
             logical_number,
             name,
@@ -388,14 +510,7 @@ def post_to_glpi(  # noqa: C901
             switch_info,
         )
 
-        child.sendline("sudo ethtool " + name)
-        child.expect(".*\$ ", timeout=30)  # noqa: W605
-        network_speed = child.after.strip().decode()
-        network_speed_dict = format_dicts.strip_decoded_dict(network_speed, ":")
-
-        speed = ""
-        if "Speed" in network_speed_dict and network_speed_dict["Speed"][-4:] == "Mb/s":
-            speed = network_speed_dict["Speed"][0:-4]
+        speed = speeds.get(name, "")
 
         nic_id = ""
         if name in nic_ids:
@@ -409,16 +524,23 @@ def post_to_glpi(  # noqa: C901
                 "items_devicenetworkcards_id": nic_id,
                 "speed": speed,
             },
+            glpi_fields_cache=fields_cache,
         )
         logical_number += 1
 
     # Create Memory types.
     if "MemTotal:" in ram_dict:
         memory_type_id = check_and_post(
-            session, urls.DEVICE_MEMORY_TYPE_URL, {"name": "Unspecified"}
+            session,
+            urls.DEVICE_MEMORY_TYPE_URL,
+            {"name": "Unspecified"},
+            glpi_fields_cache=fields_cache,
         )
         manufacturers_id = check_and_post(
-            session, urls.MANUFACTURER_URL, {"name": "Unspecified"}
+            session,
+            urls.MANUFACTURER_URL,
+            {"name": "Unspecified"},
+            glpi_fields_cache=fields_cache,
         )
         memory_id = check_and_post(
             session,
@@ -430,13 +552,14 @@ def post_to_glpi(  # noqa: C901
                 "size_default": ram_dict["MemTotal:"],
                 "devicememorytypes_id": memory_type_id,
             },
+            glpi_fields_cache=fields_cache,
         )
 
         # Create Memory Items.
         check_and_post_device_memory_item(
             session,
             urls.DEVICE_MEMORY_ITEM_URL,
-            COMPUTER_ID,
+            computer_id,
             "Computer",
             memory_id,
             ram_dict["MemTotal:"],
@@ -452,28 +575,51 @@ def post_to_glpi(  # noqa: C901
 
     # Create Disk items.
     for disk_id in disk_dict:
-        size = 0
-        if disk_dict[disk_id]["Size"][-1:] == "G":
-            size = float(disk_dict[disk_id]["Size"][:-1]) * 1000
-        elif disk_dict[disk_id]["Size"][-1:] == "T":
-            size = float(disk_dict[disk_id]["Size"][:-1]) * 1000000
-        else:
-            size = float(disk_dict[disk_id]["Size"][:-1])
-
+        # The disk is matched by name, so that a change in its size (ex: from the
+        # rounded sizes lsblk printed before) updates it rather than adding another.
         check_and_post(
             session,
             urls.DISK_ITEM_URL,
             {
-                "items_id": COMPUTER_ID,
+                "items_id": computer_id,
                 "itemtype": "Computer",
                 "name": disk_id,
-                "totalsize": size,
             },
+            {"totalsize": disk_dict[disk_id]["Size"]},
+            glpi_fields_cache=fields_cache,
         )
 
     return
 
 
+def gather_sections(ssh_command: list) -> dict:
+    """A method to run every information gathering command on the CoreOS node in a
+       single SSH invocation. Each command's output is preceded by a
+       '===<section>===' line so that the combined output can be split back up by
+       section.
+
+    Args:
+        ssh_command (list): The ssh command and arguments to reach the CoreOS node
+
+    Returns:
+        sections (dict): The output of each command, keyed by section
+    """
+    script = "section() { printf '\\n===%s===\\n' \"$1\"; }"
+    for section, command in GATHER_COMMANDS.items():
+        script += "; section " + section + "; " + command
+    script += "; for n in $(ls /sys/class/net); do"
+    for section, command in GATHER_INTERFACE_COMMANDS.items():
+        script += " section " + section + ":$n; " + command + ";"
+    script += " done; true"
+
+    output = subprocess.check_output(
+        ssh_command + [script], encoding="utf-8", timeout=GATHER_TIMEOUT
+    )
+
+    split_output = SECTION_PATTERN.split(output)
+    return dict(zip(split_output[1::2], split_output[2::2]))
+
+
 # Executes main if run as a script.
 if __name__ == "__main__":
     main()
@@ -17,6 +17,7 @@ import sys
 import socket
 import argparse
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append("..")
 import re
@@ -29,6 +30,8 @@ from common.utils import (
     check_fields,
     check_field,
     print_error_table,
+    get_computers_by_serial,
+    prefetch_fields,
 )
 from common.switches import Switches
 from common.parser import argparser
@@ -42,6 +45,10 @@ import urllib3
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Redfish GETs issued at once when expanding a collection. BMCs are small
+# embedded web servers, so keep this low.
+REDFISH_MAX_WORKERS = 4
+
 
 def main() -> None:
     """Main function"""
@@ -311,6 +318,26 @@ def get_redfish_system(redfish_session: redfish.rest.v1.HttpClient) -> dict:
         return system_summary.dict
 
 
+def get_redfish_responses(
+    redfish_session: redfish.rest.v1.HttpClient, uris: list
+) -> list:
+    """Get several Redfish resources concurrently, rather than one after the other
+
+    Args:
+        redfish_session (Redfish HTTP Client): The Redfish client object
+        uris (list): The Redfish URI's to get
+
+    Returns:
+        list: The Redfish responses, in the same order as the URI's
+    """
+    if not uris:
+        return []
+    with ThreadPoolExecutor(
+        max_workers=min(len(uris), REDFISH_MAX_WORKERS)
+    ) as executor:
+        return list(executor.map(redfish_session.get, uris))
+
+
 def get_processor(redfish_session: redfish.rest.v1.HttpClient) -> list:
     """Get information about processors from Redfish
 
@@ -325,9 +352,11 @@ def get_processor(redfish_session: redfish.rest.v1.HttpClient) -> list:
     cpu_list = []
     if processor_response.status == 200:
         processor_summary = processor_response.dict
-        for cpu in processor_summary.get("Members", []):
-            cpu_info = redfish_session.get(cpu["@odata.id"])
-            cpu_list.append(cpu_info.dict)
+        cpu_infos = get_redfish_responses(
+            redfish_session,
+            [cpu["@odata.id"] for cpu in processor_summary.get("Members", [])],
+        )
+        cpu_list = [cpu_info.dict for cpu_info in cpu_infos]
     return cpu_list
 
 
@@ -345,9 +374,11 @@ def get_memory(redfish_session: redfish.rest.v1.HttpClient) -> list:
     ram_list = []
     if memory_response.status == 200:
         memory_summary = memory_response.dict
-        for ram in memory_summary.get("Members", []):
-            ram_info = redfish_session.get(ram["@odata.id"])
-            ram_list.append(ram_info.dict)
+        ram_infos = get_redfish_responses(
+            redfish_session,
+            [ram["@odata.id"] for ram in memory_summary.get("Members", [])],
+        )
+        ram_list = [ram_info.dict for ram_info in ram_infos]
     return ram_list
 
 
@@ -366,11 +397,19 @@ def get_storage(redfish_session: redfish.rest.v1.HttpClient) -> list:  # noqa: C
     drive_list = []
     if storage_response.status == 200:
         storage_summary = storage_response.dict
-        for storage in storage_summary.get("Members", []):
-            storage_info = redfish_session.get(storage["@odata.id"])
-            for drive in storage_info.dict.get("Drives", []):
-                drive_info = redfish_session.get(drive["@odata.id"])
-                drive_list.append(drive_info.dict)
+        storage_infos = get_redfish_responses(
+            redfish_session,
+            [storage["@odata.id"] for storage in storage_summary.get("Members", [])],
+        )
+        drive_infos = get_redfish_responses(
+            redfish_session,
+            [
+                drive["@odata.id"]
+                for storage_info in storage_infos
+                for drive in storage_info.dict.get("Drives", [])
+            ],
+        )
+        drive_list = [drive_info.dict for drive_info in drive_infos]
 
     # Get HP-specific disks
     system_summary = get_redfish_system(redfish_session)
@@ -394,31 +433,39 @@ def get_storage(redfish_session: redfish.rest.v1.HttpClient) -> list:  # noqa: C
                             ]
                         )
             if smart_storage_info:
-                if "Links" in smart_storage_info.dict:
-                    if "ArrayControllers" in smart_storage_info.dict["Links"]:
-                        ac_info = redfish_session.get(
-                            smart_storage_info.dict["Links"]["ArrayControllers"][
-                                "@odata.id"
-                            ]
-                        )
-                        if "Members" in ac_info.dict:
-                            for ac in ac_info.dict["Members"]:
-                                ac_member_info = redfish_session.get(ac["@odata.id"])
-                                if "Links" in ac_member_info.dict:
-                                    if "PhysicalDrives" in ac_member_info.dict["Links"]:
-                                        hp_drive_endpoint = redfish_session.get(
-                                            ac_member_info.dict["Links"][
-                                                "PhysicalDrives"
-                                            ]["@odata.id"]
-                                        )
-                                        if "Members" in hp_drive_endpoint.dict:
-                                            for hp_drive in hp_drive_endpoint.dict[
-                                                "Members"
-                                            ]:
-                                                hp_drive_info = redfish_session.get(
-                                                    hp_drive["@odata.id"]
-                                                )
-                                                drive_list.append(hp_drive_info.dict)
+                # RestResponse.dict decodes the body on every access, so bind it once.
+                smart_storage_links = smart_storage_info.dict.get("Links", {})
+                if "ArrayControllers" in smart_storage_links:
+                    ac_info = redfish_session.get(
+                        smart_storage_links["ArrayControllers"]["@odata.id"]
+                    ).dict
+                    ac_member_infos = get_redfish_responses(
+                        redfish_session,
+                        [ac["@odata.id"] for ac in ac_info.get("Members", [])],
+                    )
+                    ac_member_links = [
+                        ac_member_info.dict.get("Links", {})
+                        for ac_member_info in ac_member_infos
+                    ]
+                    hp_drive_endpoints = get_redfish_responses(
+                        redfish_session,
+                        [
+                            links["PhysicalDrives"]["@odata.id"]
+                            for links in ac_member_links
+                            if "PhysicalDrives" in links
+                        ],
+                    )
+                    hp_drive_infos = get_redfish_responses(
+                        redfish_session,
+                        [
+                            hp_drive["@odata.id"]
+                            for hp_drive_endpoint in hp_drive_endpoints
+                            for hp_drive in hp_drive_endpoint.dict.get("Members", [])
+                        ],
+                    )
+                    drive_list.extend(
+                        hp_drive_info.dict for hp_drive_info in hp_drive_infos
+                    )
     return drive_list
 
 
@@ -438,37 +485,48 @@ def get_network(redfish_session: redfish.rest.v1.HttpClient) -> list:
     eth_list = []
     if network_response.status == 200:
         network_summary = network_response.dict
-        for nic in network_summary.get("Members", []):
-            network_interface = redfish_session.get(nic["@odata.id"])
+        network_interfaces = get_redfish_responses(
+            redfish_session,
+            [nic["@odata.id"] for nic in network_summary.get("Members", [])],
+        )
+        network_adapter_endpoints = []
+        for network_interface_response in network_interfaces:
+            # RestResponse.dict decodes the body on every access, so bind it once.
+            network_interface = network_interface_response.dict
             if (
-                "Links" in network_interface.dict
-                and "NetworkAdapter" in network_interface.dict["Links"]
+                "Links" in network_interface
+                and "NetworkAdapter" in network_interface["Links"]
             ):
-                network_adapter_endpoint = network_interface.dict["Links"][
-                    "NetworkAdapter"
-                ]["@odata.id"]
-                nic_info = redfish_session.get(network_adapter_endpoint)
-                nic_list.append(nic_info.dict)
-                network_ports = nic_info.dict.get("NetworkPorts")
-                if isinstance(network_ports, list):
-                    ports_info = redfish_session.get(
-                        nic_info.dict["NetworkPorts"][0]["@odata.id"]
-                    )
-                elif network_ports is not None:
-                    ports_info = redfish_session.get(
-                        nic_info.dict["NetworkPorts"]["@odata.id"]
-                    )
-                else:
-                    ports_info = None
-                if ports_info is not None:
-                    for port in ports_info.dict.get("Members", []):
-                        if "@odata.id" in port:
-                            port_info = redfish_session.get(port["@odata.id"])
-                            port_list.append(port_info.dict)
+                network_adapter_endpoints.append(
+                    network_interface["Links"]["NetworkAdapter"]["@odata.id"]
+                )
+        nic_infos = get_redfish_responses(redfish_session, network_adapter_endpoints)
+        ports_endpoints = []
+        for nic_info_response in nic_infos:
+            nic_info = nic_info_response.dict
+            nic_list.append(nic_info)
+            network_ports = nic_info.get("NetworkPorts")
+            if isinstance(network_ports, list):
+                ports_endpoints.append(network_ports[0]["@odata.id"])
+            elif network_ports is not None:
+                ports_endpoints.append(network_ports["@odata.id"])
+        ports_infos = get_redfish_responses(redfish_session, ports_endpoints)
+        port_infos = get_redfish_responses(
+            redfish_session,
+            [
+                port["@odata.id"]
+                for ports_info in ports_infos
+                for port in ports_info.dict.get("Members", [])
+                if "@odata.id" in port
+            ],
+        )
+        port_list = [port_info.dict for port_info in port_infos]
     ethernet_summary = redfish_session.get(REDFISH_SYSTEMS_ETHERNET_INTERFACES_URI)
-    for eth in ethernet_summary.dict.get("Members", []):
-        ethernet_interface = redfish_session.get(eth["@odata.id"])
-        eth_list.append(ethernet_interface.dict)
+    ethernet_interfaces = get_redfish_responses(
+        redfish_session,
+        [eth["@odata.id"] for eth in ethernet_summary.dict.get("Members", [])],
+    )
+    eth_list = [ethernet_interface.dict for ethernet_interface in ethernet_interfaces]
 
     if port_list:
         return nic_list, port_list
@@ -552,19 +610,54 @@ def post_to_glpi(  # noqa: C901
     #
     # NOTE: Different helper functions exist because of different syntax,
     #       field names, and formatting in the API.
+    #
+    # The GLPI fields at each URL are fetched once and reused by every check,
+    # as the same URLs (ex: manufacturers) are checked for many components. The
+    # tables are independent, so fetch all of those needed at once up front.
+    fields_cache = {}
+    prefetch_urls = [
+        urls.COMPUTER_TYPE_URL,
+        urls.MANUFACTURER_URL,
+        urls.COMPUTER_MODEL_URL,
+        urls.LOCATION_URL,
+    ]
+    if nics_dict:
+        prefetch_urls += [
+            urls.DEVICE_NETWORK_CARD_MODEL_URL,
+            urls.DEVICE_NETWORK_CARD_URL,
+            urls.DEVICE_NETWORK_CARD_ITEM_URL,
+        ]
+    if networks_dict:
+        prefetch_urls += [urls.NETWORK_PORT_URL, urls.NETWORK_PORT_ETHERNET_URL]
+    if ram_list:
+        prefetch_urls += [urls.DEVICE_MEMORY_TYPE_URL, urls.DEVICE_MEMORY_URL]
+    if drive_list:
+        prefetch_urls.append(urls.DISK_ITEM_URL)
+    prefetch_fields(session, prefetch_urls, fields_cache)
     computer_type_id = check_and_post(
-        session, urls.COMPUTER_TYPE_URL, {"name": "Server"}
+        session,
+        urls.COMPUTER_TYPE_URL,
+        {"name": "Server"},
+        glpi_fields_cache=fields_cache,
     )
 
     manufacturers_id = check_and_post(
-        session, urls.MANUFACTURER_URL, {"name": system_json["Manufacturer"]}
+        session,
+        urls.MANUFACTURER_URL,
+        {"name": system_json["Manufacturer"]},
+        glpi_fields_cache=fields_cache,
     )
     computer_model_id = check_and_post(
-        session, urls.COMPUTER_MODEL_URL, {"name": system_json["Model"]}
+        session,
+        urls.COMPUTER_MODEL_URL,
+        {"name": system_json["Model"]},
+        glpi_fields_cache=fields_cache,
     )
     if cpu_list:
         processors_id = check_and_post_processor(session, cpu_list, urls.CPU_URL, urls)
-    locations_id = check_and_post(session, urls.LOCATION_URL, {"name": lab_choice})
+    locations_id = check_and_post(
+        session, urls.LOCATION_URL, {"name": lab_choice}, glpi_fields_cache=fields_cache
+    )
 
     # The final dictionary for the machine JSON to post.
     glpi_post = {}
@@ -584,13 +677,14 @@ def post_to_glpi(  # noqa: C901
     # Add the location.
     glpi_post["locations_id"] = locations_id
 
-    # Get the list of computers and check the serial number. If the serial
-    # number matches then use a PUT to modify the cooresponding computer by ID.
-    glpi_fields_list = check_fields(session, urls.COMPUTER_URL)
+    # Get the computers with the serial number and check the UUID. If the UUID
+    # matches then use a PUT to modify the cooresponding computer by ID.
     comment = None
     COMPUTER_ID = None
-    for glpi_computer in glpi_fields_list:
-        if glpi_computer["serial"] == serial_number and glpi_computer["uuid"] == uuid:
+    for glpi_computer in get_computers_by_serial(
+        session, urls.COMPUTER_URL, serial_number
+    ):
+        if glpi_computer["uuid"] == uuid:
             global PUT
             PUT = True
             COMPUTER_ID = glpi_computer["id"]
@@ -673,6 +767,7 @@ def post_to_glpi(  # noqa: C901
                 session,
                 urls.DEVICE_NETWORK_CARD_MODEL_URL,
                 {"name": name["Model"]},
+                glpi_fields_cache=fields_cache,
             )
 
         vendor = 0
@@ -686,7 +781,10 @@ def post_to_glpi(  # noqa: C901
             manufacturers_id = vendor
             if vendor:
                 manufacturers_id = check_and_post(
-                    session, urls.MANUFACTURER_URL, {"name": vendor}
+                    session,
+                    urls.MANUFACTURER_URL,
+                    {"name": vendor},
+                    glpi_fields_cache=fields_cache,
                 )
             nic_id = check_and_post(
                 session,
@@ -697,6 +795,7 @@ def post_to_glpi(  # noqa: C901
                     "manufacturers_id": manufacturers_id,
                     "devicenetworkcardmodels_id": nic_model_id,
                 },
+                glpi_fields_cache=fields_cache,
             )
             nic_item_id = check_and_post(
                 session,
@@ -707,6 +806,7 @@ def post_to_glpi(  # noqa: C901
                     "devicenetworkcards_id": nic_id,
                     "mac": "",
                 },
+                glpi_fields_cache=fields_cache,
             )
             nic_ids[name["Id"]] = nic_item_id
 
@@ -731,7 +831,11 @@ def post_to_glpi(  # noqa: C901
         else:
             additional_information = None
         network_port_id = check_and_post(
-            session, urls.NETWORK_PORT_URL, search_criteria, additional_information
+            session,
+            urls.NETWORK_PORT_URL,
+            search_criteria,
+            additional_information,
+            glpi_fields_cache=fields_cache,
         )
         try:
             speed = name["SpeedMbps"]
@@ -756,10 +860,16 @@ def post_to_glpi(  # noqa: C901
                 "items_devicenetworkcards_id": nic_id,
                 "speed": speed,
             },
+            glpi_fields_cache=fields_cache,
         )
         logical_number += 1
 
     # Create Memory types.
+    memory_summary = system_json.get("MemorySummary", {})
+    if "TotalSystemMemoryGiB" in memory_summary:
+        total_system_memory = int(memory_summary["TotalSystemMemoryGiB"]) * 1000
+    else:
+        total_system_memory = ""
     memory_item_dict = {}
     for ram in ram_list:
         if ("Status" in ram and ram["Status"]["State"] == "Enabled") or (
@@ -770,24 +880,28 @@ def post_to_glpi(  # noqa: C901
                     session,
                     urls.DEVICE_MEMORY_TYPE_URL,
                     {"name": ram["MemoryDeviceType"]},
+                    glpi_fields_cache=fields_cache,
                 )
             elif "DIMMType" in ram:  # HP field
                 memory_type_id = check_and_post(
-                    session, urls.DEVICE_MEMORY_TYPE_URL, {"name": ram["DIMMType"]}
+                    session,
+                    urls.DEVICE_MEMORY_TYPE_URL,
+                    {"name": ram["DIMMType"]},
+                    glpi_fields_cache=fields_cache,
                 )
             else:
                 memory_type_id = check_and_post(
-                    session, urls.DEVICE_MEMORY_TYPE_URL, {"name": "Unspecified"}
+                    session,
+                    urls.DEVICE_MEMORY_TYPE_URL,
+                    {"name": "Unspecified"},
+                    glpi_fields_cache=fields_cache,
                 )
             manufacturers_id = check_and_post(
-                session, urls.MANUFACTURER_URL, {"name": ram["Manufacturer"].strip()}
+                session,
+                urls.MANUFACTURER_URL,
+                {"name": ram["Manufacturer"].strip()},
+                glpi_fields_cache=fields_cache,
             )
-            if "TotalSystemMemoryGiB" in system_json["MemorySummary"]:
-                total_system_memory = (
-                    int(system_json["MemorySummary"]["TotalSystemMemoryGiB"]) * 1000
-                )
-            else:
-                total_system_memory = ""
             if "OperatingSpeedMhz" in ram:
                 memory_id = check_and_post(
                     session,
@@ -799,6 +913,7 @@ def post_to_glpi(  # noqa: C901
                         "size_default": total_system_memory,
                         "devicememorytypes_id": memory_type_id,
                     },
+                    glpi_fields_cache=fields_cache,
                 )
             elif "MaximumFrequencyMHz" in ram:  # HP field
                 memory_id = check_and_post(
@@ -811,6 +926,7 @@ def post_to_glpi(  # noqa: C901
                         "size_default": total_system_memory,
                         "devicememorytypes_id": memory_type_id,
                     },
+                    glpi_fields_cache=fields_cache,
                 )
             if memory_id in memory_item_dict:
                 memory_item_dict[memory_id]["quantity"] += 1
@@ -849,6 +965,7 @@ def post_to_glpi(  # noqa: C901
                 "name": disk_id.get("SerialNumber"),
                 "totalsize": size,
             },
+            glpi_fields_cache=fields_cache,
         )
 
     return
@@ -12,10 +12,10 @@
 # Imports.
 import subprocess
 import sys
-import yaml
 
 sys.path.append("..")
 from common.parser import argparser
+from common.utils import load_yaml
 
 
 def main():
@@ -62,7 +62,7 @@ def parse_list(
     reservations = ""
     try:
         f = open(list, "r")
-        reservations = yaml.safe_load(f)
+        reservations = load_yaml(f)
         f.close()
     except OSError:
         sys.exit("can't open or parse %s" % (list))
@@ -43,6 +43,31 @@ def test_decoded_dict():
     assert stripped_decoded_dict["carriage_return"] == "newline"
 
 
+def test_strip_lscpu_json_dict():
+    input_string = """{
+   "lscpu": [
+      {"field": "Architecture:", "data": "x86_64"},
+      {"field": "Vendor ID:", "data": "GenuineIntel",
+         "children": [
+            {"field": "Model name:", "data": "Test CPU @ 2.00GHz",
+               "children": [
+                  {"field": "Thread(s) per core:", "data": "2"}
+               ]
+            }
+         ]
+      },
+      {"field": "Caches (sum of all):", "data": null}
+   ]
+}"""
+
+    assert format_dicts.strip_lscpu_json_dict(input_string) == {
+        "Architecture": "x86_64",
+        "Vendor ID": "GenuineIntel",
+        "Model name": "Test CPU @ 2.00GHz",
+        "Thread(s) per core": "2",
+    }
+
+
 def test_strip_network_dict():
     string = """
             space: single space\n single space
@@ -74,6 +99,27 @@ def test_strip_network_dict():
     assert "ovirtmgmt" not in stripped_network_dict
 
 
+def test_strip_ip_network_dict():
+    # fake data
+    input_string = """[
+        {"ifname": "test10", "flags": ["UP"], "link_type": "ether",
+         "address": "00:00:00:00:00:10"},
+        {"ifname": "lo", "flags": ["LOOPBACK", "UP"], "link_type": "loopback",
+         "address": "00:00:00:00:00:00"},
+        {"ifname": "test2", "flags": ["BROADCAST", "UP"], "link_type": "ether",
+         "address": "00:00:00:00:00:02"},
+        {"ifname": "down", "flags": ["BROADCAST"], "link_type": "ether",
+         "address": "00:00:00:00:00:03"}
+    ]"""
+
+    stripped_network_dict = format_dicts.strip_ip_network_dict(input_string)
+
+    assert list(stripped_network_dict.keys()) == ["lo", "test2", "test10"]
+    assert stripped_network_dict["lo"] == []
+    assert stripped_network_dict["test2"] == [["ether", "00:00:00:00:00:02"]]
+    assert stripped_network_dict["test10"] == [["ether", "00:00:00:00:00:10"]]
+
+
 def test_strip_ram_dict():
     string = """Should\nnot\nbe\nincluded\n
 
@@ -124,14 +170,17 @@ def test_strip_ram_dict_coreos():
         MemFree:         3719923 kB
         MemAvailable:    9587238 kB
         Buffers:          422764 kB
-        Cached:          8523915 kB"""
+        Cached:          8523915 kB
+        HugePages_Total:       0
+        """
     stripped_ram_dict = format_dicts.strip_ram_dict_coreos(input_dict)
     assert type(stripped_ram_dict) is dict
-    assert stripped_ram_dict["MemTotal:"] == "18723657"
-    assert stripped_ram_dict["MemFree:"] == "3719923"
-    assert stripped_ram_dict["MemAvailable:"] == "9587238"
-    assert stripped_ram_dict["Buffers:"] == "422764"
-    assert stripped_ram_dict["Cached:"] == "8523915"
+    assert stripped_ram_dict["MemTotal:"] == 18284
+    assert stripped_ram_dict["MemFree:"] == 3632
+    assert stripped_ram_dict["MemAvailable:"] == 9362
+    assert stripped_ram_dict["Buffers:"] == 412
+    assert stripped_ram_dict["Cached:"] == 8324
+    assert stripped_ram_dict["HugePages_Total:"] == 0
 
 
 def test_strip_disks_dict():
@@ -153,20 +202,21 @@ def test_strip_disks_dict():
     assert stripped_disks_dict["0: Model Name"]["carriage return"] == "carriage return"
 
 
-def test_strip_disks_dict_coreos():
+def test_strip_lsblk_disks_dict():
     # fake data
-    input_string = """NAME MAJ:MIN RM SIZE RO TYPE MOUNTPOINT
-    testa 8:0 0 123G 0 disk
-    ├─testa1 8:1 0 512M 0 part /boot
-    ├─testa2 8:2 0 99G 0 part
-    └─testa3 8:3 0 4M 0 part
-    testb 8:16 0 456G 0 disk"""
+    input_string = """{"blockdevices": [
+        {"name": "testa", "size": 123000000000, "type": "disk", "children": [
+            {"name": "testa1", "size": 536870912, "type": "part"}
+        ]},
+        {"name": "testb", "size": "456000000000", "type": "disk"},
+        {"name": "testrom", "size": 1073741312, "type": "rom"}
+    ]}"""
 
-    stripped_disks_dict = format_dicts.strip_disks_dict_coreos(input_string, "\n")
+    stripped_disks_dict = format_dicts.strip_lsblk_disks_dict(input_string)
 
     assert list(stripped_disks_dict.keys()) == ["testa", "testb"]
-    assert stripped_disks_dict["testa"] == {"Size": "123G"}
-    assert stripped_disks_dict["testb"] == {"Size": "456G"}
+    assert stripped_disks_dict["testa"] == {"Size": 123000}
+    assert stripped_disks_dict["testb"] == {"Size": 456000}
 
 
 def test_strip_nics_dict():
@@ -215,9 +265,28 @@ def test_strip_nics_dict():
     assert stripped_nics_dict["test1"]["size"] == "TestGbit/s"
 
 
-@mark.skip("Not written")
-def test_strip_nics_dict_coreos():
-    pass
+def test_strip_ip_nics_dict():
+    # fake data
+    input_string = """[
+        {"ifname": "lo", "link_type": "loopback", "address": "00:00:00:00:00:00"},
+        {"ifname": "testa", "link_type": "ether", "address": "00:00:00:00:00:0a"},
+        {"ifname": "testb", "link_type": "ether", "address": "00:00:00:00:00:0b"},
+        {"ifname": "virtual", "link_type": "ether", "address": "00:00:00:00:00:0c"}
+    ]"""
+
+    stripped_nics_dict = format_dicts.strip_ip_nics_dict(
+        input_string, ["testa", "testb"], {"testa": "10000\n"}
+    )
+
+    assert list(stripped_nics_dict.keys()) == ["testa", "testb"]
+    assert stripped_nics_dict["testa"] == {
+        "serial": "00:00:00:00:00:0a",
+        "capacity": "10000",
+    }
+    assert stripped_nics_dict["testb"] == {
+        "serial": "00:00:00:00:00:0b",
+        "capacity": "",
+    }
 
 
 def test_strip_gpu_dict():
@@ -263,6 +332,26 @@ def test_strip_gpu_dict():
     )
 
 
+def test_split_lshw_classes():
+    input_string = """*-network
+       product: Test Ethernet Controller
+       logical name: test0
+  *-display
+       product: Graphics Controller
+  *-virtio0
+       logical name: test1
+"""
+
+    gpus, nics = format_dicts.split_lshw_classes(input_string, "*", "display")
+    assert list(format_dicts.strip_gpu_dict(gpus, "*", ": ").keys()) == [
+        "Graphics Controller"
+    ]
+    assert list(format_dicts.strip_nics_dict(nics, "*", ": ").keys()) == [
+        "test0",
+        "test1",
+    ]
+
+
 def test_strip_brctl_showmacs_switch_dict():
     input_string = b"""port no mac addr                is local?       ageing timer
     1     00:11:22:33:44:55       yes                 2.37
@@ -280,28 +369,3 @@ def test_strip_brctl_showmacs_switch_dict():
 @mark.skip("Not written")
 def test_strip_show_mac_address_table_switch_dict():
     pass
-
-
-@mark.skip("Not working")
-def test_strip_accelerator_dict():
-    input_string = """
-    0b:00.0 Device accelerators: NVIDIA Corporation GV100GL [Tesla V100 PCIe 16GB] (rev a1)
-    0b:00.1 Device accelerators: NVIDIA Corporation GV100GL [Tesla V100 PCIe 16GB] (rev a1)
-    """  # noqa: E501
-
-    delimiter = " "
-
-    expected_output = {
-        "0b:00.0": {
-            "device": "GV100GL",
-            "manufacturer": "NVIDIA Corporation [Tesla V100 PCIe 16GB] (rev a1)",
-        },
-        "0b:00.1": {
-            "device": "GV100GL",
-            "manufacturer": "NVIDIA Corporation [Tesla V100 PCIe 16GB] (rev a1)",
-        },
-    }
-
-    result = format_dicts.strip_accelerator_dict(input_string, delimiter)
-
-    assert result == expected_output
@@ -1,3 +1,4 @@
+import datetime
 import sys
 
 sys.path.append("..")
@@ -12,9 +13,65 @@ def test_check_field():
     pass
 
 
-@mark.skip("Not written")
-def test_check_fields():
-    pass
+def test_check_fields(mocker):
+    session = mocker.MagicMock()
+    session.get.side_effect = [
+        mocker.MagicMock(**{"json.return_value": [{"id": 1}, {"id": 2}]}),
+        mocker.MagicMock(**{"json.return_value": ["ERROR_RANGE_EXCEED_TOTAL"]}),
+    ]
+
+    assert utils.check_fields(session, "url/") == [{"id": 1}, {"id": 2}]
+    session.get.assert_any_call(url="url/?range=0-50")
+    session.get.assert_any_call(url="url/?range=50-100")
+
+
+def test_check_fields_params(mocker):
+    session = mocker.MagicMock()
+    session.get.return_value = mocker.MagicMock(
+        **{"json.return_value": ["ERROR_RANGE_EXCEED_TOTAL"]}
+    )
+
+    assert utils.check_fields(session, "url/", utils.WITHOUT_LINKS) == []
+    session.get.assert_called_once_with(url="url/?range=0-50&get_hateoas=false")
+
+
+def test_get_computers_by_serial(mocker):
+    session = mocker.MagicMock()
+    session.get.side_effect = [
+        mocker.MagicMock(
+            **{
+                "json.return_value": [
+                    {"id": 1, "serial": "ABC123"},
+                    {"id": 2, "serial": "ABC123_TEST"},
+                ]
+            }
+        ),
+        mocker.MagicMock(**{"json.return_value": ["ERROR_RANGE_EXCEED_TOTAL"]}),
+    ]
+
+    assert utils.get_computers_by_serial(session, "url/", "ABC123") == [
+        {"id": 1, "serial": "ABC123"}
+    ]
+    session.get.assert_any_call(
+        url="url/?range=0-50&searchText%5Bserial%5D=ABC123&get_hateoas=false"
+    )
+
+
+def test_prefetch_fields(mocker):
+    check_fields = mocker.patch(
+        "common.utils.check_fields", side_effect=lambda session, url: [{"url": url}]
+    )
+    session = mocker.MagicMock()
+    fields_cache = {"a/": [{"id": 1}]}
+
+    utils.prefetch_fields(session, ["a/", "b/", "c/"], fields_cache)
+
+    assert fields_cache == {
+        "a/": [{"id": 1}],
+        "b/": [{"url": "b/"}],
+        "c/": [{"url": "c/"}],
+    }
+    assert check_fields.call_count == 2
 
 
 @mark.skip("Not written")
@@ -22,9 +79,162 @@ def test_check_field_without_range():
     pass
 
 
-@mark.skip("Not written")
-def test_check_and_post():
-    pass
+def test_check_and_post(mocker):
+    mocker.patch("common.utils.check_field", return_value=1)
+    create_or_update = mocker.patch(
+        "common.utils.create_or_update_glpi_item", return_value=1
+    )
+    session = mocker.MagicMock()
+
+    # An item matching every field sent isn't updated.
+    assert utils.check_and_post(session, "url/", {"name": "Intel"}) == 1
+    create_or_update.assert_not_called()
+
+    assert (
+        utils.check_and_post(session, "url/", {"name": "Intel"}, {"comment": ""}) == 1
+    )
+    create_or_update.assert_called_once_with(
+        session, "url/", {"name": "Intel", "comment": "", "id": 1}, 1
+    )
+
+
+def test_check_and_post_fields_cache(mocker):
+    check_fields = mocker.patch(
+        "common.utils.check_fields",
+        return_value=[{"id": 1, "name": "Intel", "comment": ""}],
+    )
+    create_or_update = mocker.patch(
+        "common.utils.create_or_update_glpi_item", return_value=2
+    )
+    session = mocker.MagicMock()
+    fields_cache = {}
+
+    # Missing items are created, existing items are only updated if they differ.
+    assert (
+        utils.check_and_post(
+            session, "url/", {"name": "Mellanox"}, glpi_fields_cache=fields_cache
+        )
+        == 2
+    )
+    assert (
+        utils.check_and_post(
+            session, "url/", {"name": "Intel"}, glpi_fields_cache=fields_cache
+        )
+        == 1
+    )
+    assert (
+        utils.check_and_post(
+            session,
+            "url/",
+            {"name": "Intel"},
+            {"comment": "NIC"},
+            glpi_fields_cache=fields_cache,
+        )
+        == 1
+    )
+    assert (
+        utils.check_and_post(
+            session, "url/", {"name": "Mellanox"}, glpi_fields_cache=fields_cache
+        )
+        == 2
+    )
+    check_fields.assert_called_once_with(session, "url/")
+    assert create_or_update.call_args_list == [
+        mocker.call(session, "url/", {"name": "Mellanox"}, None),
+        mocker.call(session, "url/", {"name": "Intel", "comment": "NIC", "id": 1}, 1),
+    ]
+    assert fields_cache == {
+        "url/": [
+            {"id": 1, "name": "Intel", "comment": "NIC"},
+            {"id": 2, "name": "Mellanox"},
+        ]
+    }
+
+
+def test_check_and_post_items(mocker):
+    mocker.patch("common.utils.check_fields", return_value=[{"id": 1, "name": "sda"}])
+    session = mocker.MagicMock()
+    session.post.return_value = mocker.MagicMock(
+        **{"json.return_value": [{"id": 2, "message": ""}, {"id": 3, "message": ""}]}
+    )
+    fields_cache = {}
+
+    utils.check_and_post_items(
+        session,
+        "url/",
+        [{"name": "sda"}, {"name": "sdb"}, {"name": "sdc"}, {"name": "sdb"}],
+        glpi_fields_cache=fields_cache,
+    )
+
+    session.post.assert_called_once_with(
+        url="url/", json={"input": [{"name": "sdb"}, {"name": "sdc"}]}
+    )
+    assert fields_cache == {
+        "url/": [
+            {"id": 1, "name": "sda"},
+            {"id": 2, "name": "sdb"},
+            {"id": 3, "name": "sdc"},
+        ]
+    }
+
+
+def test_check_and_post_items_additional_information(mocker):
+    mocker.patch(
+        "common.utils.check_fields",
+        return_value=[
+            {"id": 1, "name": "sda", "totalsize": 12},
+            {"id": 2, "name": "sdb", "totalsize": 480000},
+        ],
+    )
+    session = mocker.MagicMock()
+    session.post.return_value = mocker.MagicMock(
+        **{"json.return_value": [{"id": 3, "message": ""}]}
+    )
+    fields_cache = {}
+
+    utils.check_and_post_items(
+        session,
+        "url/",
+        [{"name": "sda"}, {"name": "sdb"}, {"name": "sdc"}],
+        glpi_fields_cache=fields_cache,
+        additional_information=[
+            {"totalsize": 12000000},
+            {"totalsize": 480000},
+            {"totalsize": 1},
+        ],
+    )
+
+    # Only the item whose size differs is updated, rather than duplicated.
+    session.put.assert_called_once_with(
+        url="url/", json={"input": [{"totalsize": 12000000, "id": 1}]}
+    )
+    session.post.assert_called_once_with(
+        url="url/", json={"input": [{"name": "sdc", "totalsize": 1}]}
+    )
+    assert fields_cache == {
+        "url/": [
+            {"id": 1, "name": "sda", "totalsize": 12000000},
+            {"id": 2, "name": "sdb", "totalsize": 480000},
+            {"id": 3, "name": "sdc", "totalsize": 1},
+        ]
+    }
+
+
+def test_check_and_post_items_rejected(mocker):
+    mocker.patch("common.utils.check_fields", return_value=[])
+    session = mocker.MagicMock()
+    session.post.return_value = mocker.MagicMock(
+        ok=False,
+        text='["ERROR_GLPI_ADD", "Bad request"]',
+        **{"json.return_value": ["ERROR_GLPI_ADD", "Bad request"]},
+    )
+    fields_cache = {}
+
+    utils.check_and_post_items(
+        session, "url/", [{"name": "sda"}], glpi_fields_cache=fields_cache
+    )
+
+    assert fields_cache == {"url/": []}
 
 
 @mark.skip("Not written")
@@ -47,9 +257,31 @@ def test_check_and_post_network_port_network_port():
     pass
 
 
-@mark.skip("Not written")
-def test_check_and_post_device_memory_item():
-    pass
+def test_check_and_post_device_memory_item(mocker):
+    mocker.patch(
+        "common.utils.check_fields",
+        return_value=[
+            {
+                "id": 5,
+                "items_id": 1,
+                "itemtype": "Computer",
+                "devicememories_id": 2,
+                "size": 16000,
+            }
+        ],
+    )
+    session = mocker.MagicMock()
+
+    utils.check_and_post_device_memory_item(session, "url/", 1, "Computer", 2, 16000, 4)
+
+    glpi_post = {
+        "items_id": 1,
+        "itemtype": "Computer",
+        "devicememories_id": 2,
+        "size": 16000,
+    }
+    session.put.assert_not_called()
+    session.post.assert_called_once_with(url="url/", json={"input": [glpi_post] * 3})
 
 
 @mark.skip("Not written")
@@ -67,11 +299,46 @@ def test_print_final_help():
     pass
 
 
+def test_load_yaml():
+    assert utils.load_yaml("a: 1\nb:\n  - c\n") == {"a": 1, "b": ["c"]}
+
+
 @mark.skip("Not written")
 def test_get_reservations():
     pass
 
 
+def test_get_reservations_dict(mocker):
+    mocker.patch(
+        "common.utils.get_reservation_details",
+        return_value=[
+            (
+                {
+                    "id": 3,
+                    "users_id": 2,
+                    "begin": "2024-01-01 10:00:00",
+                    "end": "2024-01-05 00:00:00",
+                    "comment": "",
+                },
+                {"name": "user"},
+                {"itemtype": "Computer", "items_id": 11},
+                {"name": "host"},
+            )
+        ],
+    )
+
+    # Matches what load_yaml(get_reservations(...)) gives for the same reservation
+    assert utils.get_reservations_dict(None, None) == {
+        "Reservation 3": {
+            "User 2": "user",
+            "Computer 11": "host",
+            "Begins": datetime.datetime(2024, 1, 1, 10, 0),
+            "Ends": datetime.datetime(2024, 1, 5, 0, 0),
+            "Comment": "N/A",
+        }
+    }
+
+
 @mark.skip("Not written")
 def test_get_switch_ports():
     pass
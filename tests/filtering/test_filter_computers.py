@@ -1,6 +1,47 @@
 from pytest import mark
 
+import filtering.filter_computers as filter_computers
+
 
 @mark.skip("Not written")
 def test_filter_computers():
     pass
+
+
+def test_check_disks():
+    disks_by_computer = {
+        1: [
+            {"totalsize": 500000, "name": "ssd0"},
+            {"totalsize": 1000000, "name": "hdd0"},
+        ],
+        2: [{"totalsize": 2000000, "name": "nvme0"}],
+    }
+    req_disks = [{"storage": 400000}, {"storage": 800000, "disk_type": "hdd"}]
+
+    assert filter_computers.check_disks(1, disks_by_computer, req_disks)
+    assert not filter_computers.check_disks(2, disks_by_computer, req_disks)
+    assert not filter_computers.check_disks(3, disks_by_computer, req_disks)
+    # The requirements are reused for every computer, so they must not change.
+    assert len(req_disks) == 2
+
+
+def test_get_computer_resources():
+    base = "http://localhost/apirest.php/Computer/1/"
+    computers = [
+        {
+            "id": 1,
+            "links": [
+                {"rel": "Item_DeviceProcessor", "href": base + "Item_DeviceProcessor"},
+                {"rel": "Item_DeviceMemory", "href": base + "Item_DeviceMemory"},
+            ],
+        },
+        {"id": 2, "links": []},
+    ]
+    link_cache = {
+        base + "Item_DeviceProcessor": [{"nbcores": "8"}, {"nbcores": "8"}],
+        base + "Item_DeviceMemory": [{"size": "16384"}, {"size": "16384"}],
+    }
+
+    resources = filter_computers.get_computer_resources(None, computers, link_cache)
+
+    assert resources == {1: {"cpus": 2, "cores": 16, "ram": 32768}, 2: {}}
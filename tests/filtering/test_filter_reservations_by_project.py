@@ -1,6 +1,29 @@
 from pytest import mark
 
+import filtering.filter_reservations_by_project as filter_reservations_by_project
+
 
 @mark.skip("Not written")
 def test_filter_reservations_by_project():
     pass
+
+
+def test_get_machines_reserved_with_tag(capsys):
+    reservations = {
+        "Reservation 1": {"User 1": "a", "Computer 1": "c1", "Comment": "PROJ-1 x"},
+        "Reservation 2": {"User 1": "a", "Computer 2": "c2", "Comment": "PROJ-2"},
+        "Reservation 3": {"NetworkEquipment 1": "s1", "Comment": "PROJ-1"},
+        "Reservation 4": {"User 1": "a", "Computer 9": "c9", "Comment": "PROJ-1"},
+        "Reservation 5": {"User 1": "a", "Computer 1": "c1", "Comment": ""},
+    }
+
+    filter_reservations_by_project.get_machines_reserved_with_tag(
+        [{"id": 1}, {"id": 2}], [{"id": 1}], reservations, "PROJ-1"
+    )
+
+    output = capsys.readouterr().out
+    assert str(reservations["Reservation 1"]) in output
+    assert str(reservations["Reservation 3"]) in output
+    assert "PROJ-2" not in output
+    assert "c9" not in output
+    assert "'Comment': ''" not in output
@@ -1,6 +1,24 @@
+import pytest
 from pytest import mark
 
+import population.create_glpi_computer as create_glpi_computer
+
 
 @mark.skip("Not written")
 def test_create_glpi_computer():
     pass
+
+
+@pytest.mark.parametrize(
+    "size, expected_result",
+    [
+        ("12.0TB", 12000000),
+        ("1.5GB", 1500),
+        ("480GB", 480000),
+        ("16 GB", 16000),
+        ("1024 MB", 1024),
+        ("500kB", 1),
+    ],
+)
+def test_get_size_in_mb(size, expected_result):
+    assert create_glpi_computer.get_size_in_mb(size) == expected_result